@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+benchmarks of iparse with the fixtures of tests, and synthetic scaled ones
+
+    # run all cases, write results to a json file
+    python benchmarks/bench.py run -o results.json
+
+    # only cases whose name contains any of the keywords, `--large` adds the 100MB json stream
+    python benchmarks/bench.py run -o results.json -k linkedin list_demo --large
+
+    # compare with a stored baseline, exit with 1 if any regression
+    python benchmarks/bench.py compare baseline.json results.json --threshold 0.1
+'''
+
+import argparse
+import datetime
+import gc
+import json
+from pathlib import Path
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HOME_DIR = Path(__file__).parents[1]
+sys.path.append(str(HOME_DIR))
+
+import iparse
+from tests.test_iparser import XkcdParser
+from tests.test_json_parser import DictDemoParser, ListDemoParser
+from tests.test_linkedin import LinkedinParser
+
+FIXTURES = HOME_DIR / 'tests'
+
+# only logs of errors, so logging is not measured
+PARSER_KWARGS = dict(log_level=40)
+
+# higher is better for docs_per_sec, lower is better for others
+METRICS = {
+    'docs_per_sec': 1,
+    'p50_ms': -1,
+    'p90_ms': -1,
+    'p99_ms': -1,
+    'peak_kb': -1,
+}
+
+
+def _html_case(parser_cls, file_name, **kwargs):
+    def _setup(workdir):
+        parser = parser_cls(file_name='', **dict(PARSER_KWARGS, **kwargs))
+        raw = (FIXTURES / file_name).read_bytes()
+        return lambda: parser.parse(raw), 1
+
+    return _setup
+
+
+def _json_case(parser_cls, file_name, items=None):
+    """ `items`: scale the top level list to this size by repeating its elements """
+
+    def _setup(workdir):
+        parser = parser_cls(file_name='', **PARSER_KWARGS)
+        raw = (FIXTURES / file_name).read_bytes()
+        if items:
+            elems = json.loads(raw)
+            raw = json.dumps([elems[i % len(elems)] for i in range(items)]).encode()
+        return lambda: parser.parse(raw), items or 1
+
+    return _setup
+
+
+def _json_stream_case(size_mb):
+    """ a list_demo json array of `size_mb` MB on disk, parsed by `iter_parse` """
+
+    def _setup(workdir):
+        elems = json.loads((FIXTURES / 'list_demo.json').read_bytes())
+        file_name = Path(workdir) / 'list_demo_{}mb.json'.format(size_mb)
+        items = 0
+        with open(file_name, 'w') as fp:
+            fp.write('[')
+            while fp.tell() < size_mb * 1024 * 1024:
+                fp.write(',' if items else '')
+                fp.write(json.dumps(elems[items % len(elems)]))
+                items += 1
+            fp.write(']')
+
+        parser = ListDemoParser(file_name='', **PARSER_KWARGS)
+        return lambda: sum(1 for _ in parser.iter_parse(file_name)), items
+
+    return _setup
+
+
+# name: (setup(workdir) => (run one round, docs per round), large, traced), latency percentiles are of rounds
+# traced: memory is allocated by python, so `peak_kb` by tracemalloc is meaningful,
+# lxml trees live in libxml2 memory, which tracemalloc never sees
+CASES = {
+    'linkedin': (_html_case(LinkedinParser, 'linkedin.html'), False, True),
+    'linkedin_lxml': (_html_case(LinkedinParser, 'linkedin.html', engine='lxml'), False, False),
+    'xkcd': (_html_case(XkcdParser, 'xkcd_python_353.htm'), False, True),
+    'xkcd_lxml': (_html_case(XkcdParser, 'xkcd_python_353.htm', engine='lxml'), False, False),
+    'dict_demo': (_json_case(DictDemoParser, 'dict_demo.json'), False, True),
+    'list_demo': (_json_case(ListDemoParser, 'list_demo.json'), False, True),
+    'list_demo_10k': (_json_case(ListDemoParser, 'list_demo.json', items=10000), False, True),
+    'list_demo_stream_100mb': (_json_stream_case(100), True, True),
+}
+
+
+def percentile(values, pct):
+    """ nearest-rank percentile of sorted values """
+    index = max(int(round(pct / 100.0 * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def bench_case(setup, workdir, min_time=1.0, min_rounds=5, max_rounds=1000, traced=True):
+    """
+    run one case: a warm up round, rounds until `min_time` (and `min_rounds`), then one more round with tracemalloc
+
+    Args:
+        traced (bool): measure `peak_kb` by tracemalloc, False if most memory is not allocated by python
+
+    Returns:
+        dict of metrics, without `peak_kb` if not traced
+    """
+    run, docs = setup(workdir)
+    run()
+
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_rounds and (len(latencies) < min_rounds or time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+    elapsed = sum(latencies)
+
+    latencies.sort()
+    metrics = {
+        'rounds': len(latencies),
+        'docs_per_round': docs,
+        'docs_per_sec': round(docs * len(latencies) / elapsed, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+    if not traced:
+        return metrics
+
+    # tracemalloc slows python down, so peak memory is measured apart
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    metrics['peak_kb'] = round(peak / 1024, 1)
+    return metrics
+
+
+def run(args):
+    names = [
+        x
+        for x, (_, large, _) in CASES.items()
+        if (args.large or not large) and (not args.keywords or any(k in x for k in args.keywords))
+    ]
+    results = {
+        'meta': {
+            'iparse': iparse.VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        },
+        'cases': {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in names:
+            setup, large, traced = CASES[name]
+            metrics = bench_case(setup, workdir, min_time=args.min_time, min_rounds=1 if large else 5, traced=traced)
+            results['cases'][name] = metrics
+            peak = '{:>10.1f}KB'.format(metrics['peak_kb']) if 'peak_kb' in metrics else '{:>12}'.format('n/a')
+            print(
+                '{:<24} {:>12.1f} docs/s  p50 {:>9.3f}ms  p99 {:>9.3f}ms  peak {}'.format(
+                    name, metrics['docs_per_sec'], metrics['p50_ms'], metrics['p99_ms'], peak
+                )
+            )
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+    return 0
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """
+    metrics missing on either side are skipped, e.g. `peak_kb` of lxml cases
+
+    Returns:
+        list: [(case, metric, baseline value, current value, change ratio, regressed)]
+    """
+    rows = []
+    for name, metrics in current['cases'].items():
+        base = baseline['cases'].get(name)
+        if not base:
+            continue
+        for metric, better in METRICS.items():
+            if not base.get(metric) or metric not in metrics:
+                continue
+            change = (metrics[metric] - base[metric]) / base[metric]
+            rows.append((name, metric, base[metric], metrics[metric], change, change * better < -threshold))
+    return rows
+
+
+def compare(args):
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+    with open(args.current) as fp:
+        current = json.load(fp)
+
+    rows = compare_results(baseline, current, args.threshold)
+    for name, metric, base, value, change, regressed in rows:
+        print(
+            '{:<24} {:<14} {:>12} {:>12} {:>+8.1%} {}'.format(
+                name, metric, base, value, change, 'REGRESSION' if regressed else ''
+            )
+        )
+    regressions = [x for x in rows if x[-1]]
+    print('{} regressions of {} metrics, threshold {:.0%}'.format(len(regressions), len(rows), args.threshold))
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmarks of iparse')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    _run = commands.add_parser('run', help='run benchmarks')
+    _run.add_argument('-o', '--output', help='json file to write results')
+    _run.add_argument('-k', '--keywords', nargs='*', help='only cases whose name contains any keyword')
+    _run.add_argument('--large', action='store_true', help='include large cases, e.g. the 100MB json stream')
+    _run.add_argument('--min-time', type=float, default=1.0, help='seconds to run each case at least')
+    _run.set_defaults(func=run)
+
+    _compare = commands.add_parser('compare', help='compare results with a baseline')
+    _compare.add_argument('baseline')
+    _compare.add_argument('current')
+    _compare.add_argument('--threshold', type=float, default=0.1, help='relative change flagged as regression')
+    _compare.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
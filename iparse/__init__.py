@@ -1,3 +1,14 @@
 VERSION = '0.0.6.4'
 
 from iparse._parse import *
+from iparse._plan import *
+from iparse._selector import *
+from iparse._pool import *
+from iparse._engine import *
+from iparse._lazy import *
+from iparse._aio import *
+from iparse._profile import *
+from iparse._ndjson import *
+from iparse._records import *
+from iparse._refine import *
+from iparse._memo import *
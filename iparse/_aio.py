@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+parse documents from asyncio code, parsing runs in an executor so the event loop is never blocked
+'''
+
+import asyncio
+import collections
+import concurrent.futures
+import threading
+
+from iparse._pool import local_parser, merge_profilers
+
+__all__ = [
+    'parse_stream',
+]
+
+
+def _parse_copy(parser, doc):
+    # parser is pickled into the process, without document state
+    return parser.parse(doc)
+
+
+async def _aiter(docs):
+    if hasattr(docs, '__aiter__'):
+        async for doc in docs:
+            yield doc
+    else:
+        for doc in docs:
+            yield doc
+
+
+async def parse_stream(parser, docs, concurrency=4, executor=None, ordered=True):
+    """
+    parse documents of an async (or normal) iterable in an executor, with at most `concurrency` documents in flight,
+    next document is not pulled from `docs` until one is done and consumed, so slow consumers slow down producers
+
+    e.g.:
+        async for url, data in parse_stream(xkcd, fetch_pages(urls), concurrency=8):
+            ...
+
+    Args:
+        parser (IParser): a built parser, used as template and never parses itself
+        docs (iterable/async iterable): anything accepted by `parser.parse`, or (meta, doc) tuples,
+            meta (e.g. url) is yielded with data as it is
+        concurrency (int): documents parsed at the same time
+        executor (Executor/None): thread pool by default (loop's default executor),
+            with a `ProcessPoolExecutor` the parser is pickled without document state for each document
+        ordered (bool): yield in input order if True, else in completion order
+
+    Yields:
+        (meta, data), meta is None if doc is not a tuple
+    """
+    loop = asyncio.get_running_loop()
+    concurrency = max(int(concurrency), 1)
+    # compile plan once, before it is copied
+    parser.selected_plan
+    # thread copies, whose profilers are merged into `parser.profiler` when done
+    copies = []
+
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        submit = lambda doc: loop.run_in_executor(executor, _parse_copy, parser, doc)
+    else:
+        local = threading.local()
+        submit = lambda doc: loop.run_in_executor(executor, lambda: local_parser(local, parser, copies).parse(doc))
+
+    pending = collections.deque()
+
+    async def _done():
+        if ordered:
+            meta, future = pending.popleft()
+            return meta, await future
+        await asyncio.wait([x[1] for x in pending], return_when=asyncio.FIRST_COMPLETED)
+        for item in pending:
+            if item[1].done():
+                pending.remove(item)
+                return item[0], item[1].result()
+
+    try:
+        async for item in _aiter(docs):
+            meta, doc = item if isinstance(item, tuple) else (None, item)
+            pending.append((meta, submit(doc)))
+            if len(pending) >= concurrency:
+                yield await _done()
+
+        while pending:
+            yield await _done()
+    finally:
+        for _, future in pending:
+            future.cancel()
+        merge_profilers(parser, copies)
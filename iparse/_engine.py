@@ -0,0 +1,498 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+engines to build document tree and read elements
+
+    - bs4: BeautifulSoup tree, css selectors evaluated by soupsieve
+    - lxml: native lxml.html tree, css selectors translated to compiled XPath once
+'''
+
+import codecs
+import functools
+import mmap
+import operator
+import re
+import sys
+import threading
+
+import bs4
+from bs4 import BeautifulSoup, SoupStrainer
+
+from iparse._selector import compile_selector
+
+__all__ = [
+    'compare_engines',
+]
+
+
+class Bs4Engine(object):
+    name = 'bs4'
+    node_types = (bs4.Tag,)
+    # guessing by UnicodeDammit is slow, parser sniffs encoding of bytes and passes it as `from_encoding`
+    sniff_encoding = True
+
+    @staticmethod
+    def used_encoding(soup):
+        return soup.original_encoding
+
+    text = operator.attrgetter('text')
+    get_attr = bs4.Tag.get
+
+    @staticmethod
+    def get_text(elem, joiner, strip):
+        return bs4.Tag.get_text(elem, joiner, strip=strip)
+
+    @staticmethod
+    def select(node, locator, is_root=False):
+        return compile_selector(locator, getattr(node, '_namespaces', None)).select(node)
+
+    @staticmethod
+    def build(raw, features='lxml', encoding='', parse_only=None):
+        """ fail over with 'html.parser' """
+        if isinstance(raw, (memoryview, bytearray, mmap.mmap)):
+            # bs4 reads files by itself, but only accepts str/bytes content,
+            # `read` of mmap would move its position, so it could not be parsed again
+            raw = bytes(raw)
+        params = dict(
+            features=features,
+        )
+        if encoding:
+            params['from_encoding'] = encoding
+        if parse_only is not None:
+            params['parse_only'] = parse_only
+        try:
+            return BeautifulSoup(raw, **params)
+        except bs4.FeatureNotFound:
+            params['features'] = 'html.parser'
+            return BeautifulSoup(raw, **params)
+
+    @staticmethod
+    def release(soup):
+        """
+        decompose the tree, so it is freed at once instead of waiting for gc to break its parent/sibling cycles
+
+        Returns:
+            int: estimated bytes of python objects of the tree
+        """
+        size = sys.getsizeof(soup)
+        for node in soup.descendants:
+            size += sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+            if isinstance(node, bs4.Tag):
+                size += sys.getsizeof(node.attrs) + sys.getsizeof(node.contents)
+        soup.decompose()
+        return size
+
+
+class LxmlEngine(object):
+    """
+    works on `lxml.html` tree directly, output is same as bs4:
+
+        - text: strings inside script/style/template/rt/rp are skipped, as bs4 does
+        - attribute: multi-valued attributes (class/rel/...) are split into list, as bs4 does
+        - selector: elems inside the node are matched, while the rest of the selector may match its ancestors,
+          e.g. `div#x li` under <ul> of <div id="x">, as soupsieve does
+    """
+
+    name = 'lxml'
+    node_types = ()
+    # libxml2 reads BOM and meta charset by itself, and utf-8 is validated before parsing
+    sniff_encoding = False
+
+    # bs4 keeps strings inside these tags in their own string types, which `.text` ignores
+    string_container_tags = ('script', 'style', 'template', 'rt', 'rp')
+    # same as bs4.builder.HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES
+    cdata_list_attributes = bs4.builder.HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES
+
+    _local = threading.local()
+    _init_lock = threading.Lock()
+
+    @classmethod
+    def _lxml(cls):
+        """ lxml and cssselect are only required by this engine """
+        if not cls.node_types:
+            with cls._init_lock:
+                if not cls.node_types:
+                    cls._init_lxml()
+        return cls.node_types[0]
+
+    @classmethod
+    def _init_lxml(cls):
+        # only once, under `_init_lock`: elements of two element classes would fail `isinstance` checks
+        try:
+            import cssselect
+            import lxml.etree
+            import lxml.html
+        except ImportError as e:
+            raise ImportError('engine lxml requires lxml and cssselect: {}'.format(e))
+
+        class HtmlElement(lxml.html.HtmlElement):
+            def __bool__(self):
+                # like bs4.Tag, an element is always True, even without children
+                return True
+
+        class ScopedTranslator(cssselect.HTMLTranslator):
+            """
+            combinators are conditions of the last compound selector on its ancestors/siblings,
+            e.g. `div#x > a` => `a[parent::div[@id = 'x']]`, so they are not limited to the node searched in
+            """
+
+            def xpath_descendant_combinator(self, left, right):
+                return right.add_condition('ancestor::{}'.format(left))
+
+            def xpath_child_combinator(self, left, right):
+                return right.add_condition('parent::{}'.format(left))
+
+            def xpath_direct_adjacent_combinator(self, left, right):
+                return right.add_condition('preceding-sibling::*[1]/self::{}'.format(left))
+
+            def xpath_indirect_adjacent_combinator(self, left, right):
+                return right.add_condition('preceding-sibling::{}'.format(left))
+
+        cls._translator = cssselect.HTMLTranslator()
+        cls._scoped_translator = ScopedTranslator()
+        cls._text_expr = 'descendant::text()[not({})]'.format(
+            ' or '.join('ancestor::{}'.format(x) for x in cls.string_container_tags)
+        )
+        # set last, other threads skip the lock once it is set
+        cls.node_types = (HtmlElement,)
+
+    @classmethod
+    def _xpaths(cls):
+        """ compiled XPath objects hold a lock while evaluating, so each thread compiles its own """
+        xpaths = getattr(cls._local, 'xpaths', None)
+        if xpaths is None:
+            import lxml.etree
+
+            cls._lxml()
+            # (text, all text)
+            xpaths = cls._local.xpaths = (
+                lxml.etree.XPath(cls._text_expr, smart_strings=False),
+                lxml.etree.XPath('descendant::text()', smart_strings=False),
+            )
+        return xpaths
+
+    @classmethod
+    def _parser(cls, encoding=None):
+        # lxml parsers should not be shared among threads
+        parsers = cls._local.__dict__.setdefault('parsers', {})
+        if encoding not in parsers:
+            import lxml.etree
+            import lxml.html
+
+            parser = lxml.html.HTMLParser(encoding=encoding)
+            parser.set_element_class_lookup(lxml.etree.ElementDefaultClassLookup(element=cls._lxml()))
+            parsers[encoding] = parser
+        return parsers[encoding]
+
+    @classmethod
+    def build(cls, raw, features='lxml', encoding='', parse_only=None):
+        """
+        libxml2 builds the whole tree fast enough, so `parse_only` is ignored
+
+        bytes, `memoryview` and `mmap` are parsed in place, open binary files are read by libxml2 in chunks,
+        so no full copy of the document is made
+        """
+        import lxml.etree
+        import lxml.html
+
+        cls._lxml()
+        if isinstance(raw, str):
+            # lxml refuses str with an encoding declaration, e.g. `<?xml version="1.0" encoding="utf-8"?>`
+            return lxml.html.document_fromstring(raw.encode('utf-8'), parser=cls._parser('utf-8'))
+
+        if hasattr(raw, 'read') and not isinstance(raw, mmap.mmap):
+            if not encoding and _is_utf8_file(raw):
+                encoding = 'utf-8'
+            root = lxml.html.parse(raw, parser=cls._parser(encoding or None)).getroot()
+            if root is None:
+                raise lxml.etree.ParserError('Document is empty')
+            return root
+
+        with memoryview(raw) as buf:
+            # lxml only honors meta charset, which is not always there
+            if not encoding and can_decode(buf, 'utf-8'):
+                encoding = 'utf-8'
+            return lxml.html.document_fromstring(buf, parser=cls._parser(encoding or None))
+
+    @classmethod
+    def _strings(cls, elem):
+        text, all_text = cls._xpaths()
+        if elem.tag in cls.string_container_tags:
+            return all_text(elem)
+        return text(elem)
+
+    @classmethod
+    def text(cls, elem):
+        return ''.join(cls._strings(elem))
+
+    @classmethod
+    def get_text(cls, elem, joiner, strip):
+        strings = cls._strings(elem)
+        if strip:
+            strings = [x.strip() for x in strings]
+            strings = [x for x in strings if x]
+        return joiner.join(strings)
+
+    @classmethod
+    def get_attr(cls, elem, name, default=None):
+        value = elem.get(name)
+        if value is None:
+            return default
+        if name in cls.cdata_list_attributes['*'] or name in cls.cdata_list_attributes.get(elem.tag, ()):
+            return value.split()
+        return value
+
+    @classmethod
+    def select(cls, node, locator, is_root=False):
+        # the root has no ancestors to match, a top-down XPath is faster there
+        elems = compile_xpath(locator, scoped=not is_root)(node)
+        # bs4 never returns the node itself, except the root, which is the document in bs4
+        # but the <html> element in lxml. results are in document order, so node can only be the first one
+        if elems and not is_root and elems[0] is node:
+            return elems[1:]
+        return elems
+
+    @staticmethod
+    def release(root):
+        """
+        unlink all children of root, libxml2 frees a node as soon as no python proxy refers to it
+
+        Returns:
+            int: estimated bytes of libxml2 nodes and their text
+        """
+        size = 0
+        for elem in root.iter():
+            size += _XML_NODE_SIZE * (1 + len(elem.attrib)) + len(elem.text or '') + len(elem.tail or '')
+        root.clear()
+        return size
+
+
+# sizeof(xmlNode) on 64-bit platforms, an element or attribute
+_XML_NODE_SIZE = 120
+
+
+_UTF8_CHUNK_SIZE = 1 << 20
+
+
+def can_decode(buf, encoding):
+    """ validate encoding chunk by chunk, without decoding the whole buffer into one str """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)()
+    except LookupError:
+        return False
+    try:
+        for i in range(0, len(buf), _UTF8_CHUNK_SIZE):
+            decoder.decode(buf[i : i + _UTF8_CHUNK_SIZE])
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+# only the head of document is searched for encoding
+SNIFF_SIZE = 4096
+
+# utf-32 goes first, BOM_UTF32_LE starts with BOM_UTF16_LE
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# both `<meta charset="gbk">` and `<meta http-equiv="Content-Type" content="text/html; charset=gbk">`
+_META_CHARSET = re.compile(rb'<meta\b[^>]*?charset\s*=\s*["\']?\s*([\w:.+-]+)', re.I)
+
+
+def sniff_encoding(head):
+    """
+    encoding declared by BOM or meta charset, without guessing
+
+    Args:
+        head (bytes): first `SNIFF_SIZE` bytes of document
+
+    Returns:
+        str: normalized codec name, None if not declared or unknown
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    m = _META_CHARSET.search(head)
+    if not m:
+        return None
+    try:
+        encoding = codecs.lookup(m.group(1).decode('ascii')).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+    # a declaration readable as ascii can not be utf-16/32 without BOM
+    if encoding.startswith(('utf-16', 'utf-32')):
+        return None
+    return encoding
+
+
+def _is_utf8_file(fp):
+    """ validate utf-8 of a seekable file, then rewind it, False if not seekable """
+    try:
+        pos = fp.tell()
+    except (AttributeError, OSError):
+        return False
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for chunk in iter(lambda: fp.read(_UTF8_CHUNK_SIZE), b''):
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    finally:
+        fp.seek(pos)
+    return True
+
+
+XPATH_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=XPATH_CACHE_SIZE)
+def css_to_xpath(locator, scoped=False):
+    """
+    translate css selector to XPath once, shared by all threads
+
+    `descendant-or-self` is used, so `div>a` searched in a <div> matches its own <a> children as soupsieve does
+
+    Args:
+        scoped (bool): combinators may match outside the node searched in, see `ScopedTranslator`
+    """
+    LxmlEngine._lxml()
+    translator = LxmlEngine._scoped_translator if scoped else LxmlEngine._translator
+    return translator.css_to_xpath(locator, prefix='descendant-or-self::')
+
+
+def compile_xpath(locator, scoped=False):
+    """ compiled XPath of css selector, cached per thread, see `LxmlEngine._xpaths` """
+    xpaths = getattr(LxmlEngine._local, 'selectors', None)
+    if xpaths is None:
+        xpaths = LxmlEngine._local.selectors = {}
+    xpath = xpaths.get((locator, scoped))
+    if xpath is None:
+        import lxml.etree
+
+        if len(xpaths) >= XPATH_CACHE_SIZE:
+            xpaths.clear()
+        xpath = xpaths[(locator, scoped)] = lxml.etree.XPath(css_to_xpath(locator, scoped))
+    return xpath
+
+
+# simple selector can be a strainer: `div`, `div#topContainer`, `section.experience`, `#id.a.b`
+_SIMPLE_SELECTOR = re.compile(r'\s*([a-zA-Z][\w-]*)?((?:[#.][\w-]+)*)\s*$')
+
+
+@functools.lru_cache(maxsize=1024)
+def strain_rule(selector):
+    """
+    Returns:
+        (tag, id, classes) of a simple selector, None if it can not be expressed as a strainer
+    """
+    m = _SIMPLE_SELECTOR.match(selector)
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+
+    _id, classes = None, []
+    for token in re.findall(r'[#.][\w-]+', m.group(2)):
+        if token[0] == '.':
+            classes.append(token[1:])
+        elif _id is None:
+            _id = token[1:]
+        else:
+            return None
+    return (m.group(1) or '').lower(), _id, frozenset(classes)
+
+
+class MapperStrainer(SoupStrainer):
+    """ only tags matching any of the (tag, id, classes) rules are built, with all their sub nodes """
+
+    def __init__(self, rules):
+        super().__init__(name=True)
+        self.rules = tuple(rules)
+
+    def _allowed(self, name, attrs):
+        attrs = attrs or {}
+        for tag, _id, classes in self.rules:
+            if tag and tag != name:
+                continue
+            if _id is not None and attrs.get('id') != _id:
+                continue
+            if classes:
+                _class = attrs.get('class') or ''
+                _class = _class.split() if isinstance(_class, str) else _class
+                if not classes.issubset(_class):
+                    continue
+            return True
+        return False
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        # bs4 >= 4.13
+        return self._allowed(name, attrs)
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        # bs4 < 4.13
+        if isinstance(markup_name, bs4.Tag):
+            return self._allowed(markup_name.name, markup_name.attrs)
+        return self._allowed(markup_name, dict(markup_attrs))
+
+
+ENGINES = {
+    Bs4Engine.name: Bs4Engine,
+    LxmlEngine.name: LxmlEngine,
+}
+
+
+def get_engine(name):
+    if name not in ENGINES:
+        raise ValueError('engine {} not supported: {}'.format(name, list(ENGINES)))
+    return ENGINES[name]
+
+
+def _diff(expected, actual, path=''):
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in list(expected) + [x for x in actual if x not in expected]:
+            _path = '{}.{}'.format(path, key) if path else str(key)
+            if key not in expected or key not in actual:
+                diffs.append((_path, expected.get(key), actual.get(key)))
+                continue
+            diffs += _diff(expected[key], actual[key], _path)
+        return diffs
+
+    if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        diffs = []
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            diffs += _diff(a, b, '{}[{}]'.format(path, i))
+        return diffs
+
+    return [] if expected == actual else [(path, expected, actual)]
+
+
+def compare_engines(parser_cls, file_name, engines=('bs4', 'lxml'), **kwargs):
+    """
+    differential test: parse same document with each engine, and compare with the first one
+
+    Args:
+        parser_cls (type): subclass of IParser
+        file_name (str/Path): document to parse
+        engines (tuple): engine names, the first one is the baseline
+        **kwargs: kwargs to build parser
+
+    Returns:
+        list: [(engine, key path, baseline value, engine value)], empty if all engines agree
+    """
+    results = []
+    for engine in engines:
+        parser = parser_cls(file_name=file_name, engine=engine, **kwargs)
+        parser.do_parse()
+        results.append(parser.data)
+
+    diffs = []
+    for engine, data in zip(engines[1:], results[1:]):
+        diffs += [(engine,) + x for x in _diff(results[0], data)]
+    return diffs
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+decode elements of a top level json array one by one, without loading the whole file
+'''
+
+import codecs
+import json
+
+__all__ = [
+    'iter_json_array',
+]
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(fp, chunk_size=CHUNK_SIZE):
+    """
+    yield elements of a top level json array from a file object
+
+    only one chunk and the element being decoded are kept in memory
+
+    Args:
+        fp: file object opened in binary (utf-8) or text mode
+        chunk_size (int): size of each read
+
+    Yields:
+        decoded element
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+    eof = False
+
+    def _read(size):
+        nonlocal eof
+        chunk = fp.read(size)
+        if not chunk:
+            eof = True
+            return '' if isinstance(chunk, str) else utf8.decode(b'', final=True)
+        if isinstance(chunk, str):
+            return chunk
+        return utf8.decode(chunk)
+
+    buf, idx = '', 0
+
+    def _skip_whitespace():
+        nonlocal buf, idx
+        while True:
+            while idx < len(buf) and buf[idx] in _WHITESPACE:
+                idx += 1
+            if idx < len(buf) or eof:
+                return
+            buf, idx = _read(chunk_size), 0
+
+    _skip_whitespace()
+    if idx >= len(buf) or buf[idx] != '[':
+        raise ValueError('top level of json is not an array')
+    idx += 1
+
+    expect_element, after_comma = True, False
+    while True:
+        _skip_whitespace()
+        if idx >= len(buf):
+            raise ValueError('json array is not closed')
+
+        if buf[idx] == ']':
+            if expect_element and after_comma:
+                raise ValueError('trailing , in json array')
+            return
+        if not expect_element:
+            if buf[idx] != ',':
+                raise ValueError('expecting , at {!r}'.format(buf[idx : idx + 20]))
+            idx += 1
+            expect_element = after_comma = True
+            continue
+
+        while True:
+            try:
+                element, end = decoder.raw_decode(buf, idx)
+                # a number at the end of buffer may be not complete yet
+                if end < len(buf) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            # element is not complete, read as much as buffered, so large elements are decoded in O(n)
+            buf = buf[idx:] + _read(max(chunk_size, len(buf) - idx))
+            idx = 0
+
+        yield element
+        idx = end
+        expect_element = False
+        # drop consumed data
+        if idx > chunk_size:
+            buf, idx = buf[idx:], 0
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+lazy parsed data, each top level key is parsed the first time it is read
+'''
+
+import collections.abc
+import copy
+import weakref
+
+__all__ = [
+    'LazyData',
+]
+
+# a parsed key may not exist, e.g. its nodes are not found
+_MISSING = object()
+
+
+class LazyData(collections.abc.Mapping):
+    """
+    read-only mapping of parsed data, returned by `parser.data` if parser is built with `lazy=True`
+
+        - `data['key']` parses the key's sub tree of plan once, and caches the result
+        - `len`/`iter`/`==` parse all keys, as the eager dict has only keys found in document
+        - `materialize()` returns a plain dict, same as eager `do_parse`
+
+    keys are parsed against the document it is created for, even if the parser has moved on to another one
+    """
+
+    def __init__(self, parser, nodes, soup, memo=None):
+        # own copy of parser, so it is not affected by documents parsed later, even in other threads
+        self._parser = copy.copy(parser)
+        self._parser.soup = self._soup = soup
+        self._parser.raw_data = ''
+        self._parser._memo = memo
+        # `memo_stats` of parser is set once all keys are parsed, if it is still on this document
+        self._origin = weakref.ref(parser) if memo is not None else None
+        self._nodes = collections.OrderedDict((x.key, x) for x in nodes)
+        self._cache = {}
+
+    def _evaluate(self, key):
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING or key not in self._nodes:
+            return value
+
+        dat = {}
+        self._parser._run_node(self._nodes[key], self._soup, dat)
+        value = self._cache[key] = dat.get(key, _MISSING)
+        if self._origin is not None and len(self._cache) == len(self._nodes):
+            self._clear_memo()
+        return value
+
+    def _clear_memo(self):
+        # nothing is read from the tree any more, nodes kept by the memo are released
+        self._parser._clear_memo()
+        origin, self._origin = self._origin(), None
+        if origin is not None and origin._data is self:
+            origin.memo_stats = self._parser.memo_stats
+
+    def __getitem__(self, key):
+        value = self._evaluate(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._evaluate(key) is not _MISSING
+
+    def __iter__(self):
+        return iter([x for x in self._nodes if self._evaluate(x) is not _MISSING])
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        evaluated = {k: v for k, v in self._cache.items() if v is not _MISSING}
+        pending = [x for x in self._nodes if x not in self._cache]
+        return '<LazyData {} pending={}>'.format(evaluated, pending)
+
+    def __reduce__(self):
+        # pickled as plain dict, parser and document are not needed any more
+        return dict, (self.materialize(),)
+
+    @property
+    def evaluated_keys(self):
+        return [x for x in self._nodes if x in self._cache]
+
+    def materialize(self):
+        """ parse all keys not read yet, and return a plain dict """
+        return {x: self._cache[x] for x in self._nodes if self._evaluate(x) is not _MISSING}
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+logger of parser instance, with its own level, so global logzero level is never touched
+'''
+
+import logging
+
+
+class ParserLogger(logging.LoggerAdapter):
+    """
+    wraps logzero's logger, records are dropped below `level` of this parser
+
+    messages are formatted lazily, e.g. `logger.debug('[NON-ELEMS]: %s', key)`,
+    so nothing is formatted unless both this level and logzero's level are enabled
+    """
+
+    def __init__(self, logger, level=logging.DEBUG):
+        super().__init__(logger, {})
+        self.level = level
+
+    def isEnabledFor(self, level):
+        return level >= self.level and self.logger.isEnabledFor(level)
+
+    def process(self, msg, kwargs):
+        return msg, kwargs
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+memo of selector and text results of one document, so sibling keys reading same nodes do the work once
+'''
+
+__all__ = [
+    'ParseMemo',
+]
+
+
+class ParseMemo(object):
+    """
+    enabled with `memo=True`, created for each document by `do_parse` and cleared when the parse is done,
+    or owned by lazy data and cleared once all its keys are parsed
+
+        - select: elems of (node, locator), e.g. sibling keys with same `_locator` under same parent
+        - text: text of elem, e.g. several `~` keys reading text of the current node
+        - get_text: text of (elem, joiner, strip)
+
+    nodes are kept in values, so ids in keys can never be reused by other nodes (e.g. lxml proxies) meanwhile,
+    cached elems lists are shared, callers never modify them in place
+    """
+
+    __slots__ = ('_selects', '_texts', 'hits', 'misses')
+
+    def __init__(self):
+        self._selects = {}
+        self._texts = {}
+        self.hits = dict.fromkeys(('select', 'text'), 0)
+        self.misses = dict.fromkeys(('select', 'text'), 0)
+
+    def select(self, engine, node, locator, is_root=False):
+        key = (id(node), locator)
+        cached = self._selects.get(key)
+        if cached is not None:
+            self.hits['select'] += 1
+            return cached[1]
+        self.misses['select'] += 1
+        elems = engine.select(node, locator, is_root)
+        self._selects[key] = (node, elems)
+        return elems
+
+    def text(self, engine, elem):
+        key = (id(elem),)
+        cached = self._texts.get(key)
+        if cached is not None:
+            self.hits['text'] += 1
+            return cached[1]
+        self.misses['text'] += 1
+        text = engine.text(elem)
+        self._texts[key] = (elem, text)
+        return text
+
+    def get_text(self, engine, elem, joiner, strip):
+        key = (id(elem), joiner, strip)
+        cached = self._texts.get(key)
+        if cached is not None:
+            self.hits['text'] += 1
+            return cached[1]
+        self.misses['text'] += 1
+        text = engine.get_text(elem, joiner, strip)
+        self._texts[key] = (elem, text)
+        return text
+
+    def stats(self):
+        """
+        Returns:
+            dict: {'select'/'text': {hits, misses, hit_rate}}
+        """
+        stats = {}
+        for kind, hits in self.hits.items():
+            total = hits + self.misses[kind]
+            stats[kind] = {'hits': hits, 'misses': self.misses[kind], 'hit_rate': hits / total if total else 0.0}
+        return stats
+
+    def clear(self):
+        # nodes of the document are released with the memo
+        self._selects.clear()
+        self._texts.clear()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+write parsed data as newline delimited json, one compact json document per line
+'''
+
+import json
+import os
+import threading
+
+from iparse._records import _json_default
+
+__all__ = [
+    'NdjsonWriter',
+]
+
+BUFFER_SIZE = 64 * 1024
+
+
+class NdjsonWriter(object):
+    """
+    append data of many documents to one file, lines are buffered and written in batches
+
+        - compact json, no indent, keys in parsed order unless `sort_keys`
+        - parsers (their `materialize()`), `LazyData` and dicts are accepted, columns/records are dumped as dicts
+        - thread-safe, lines of each document are never interleaved
+
+    e.g.:
+        with NdjsonWriter('xkcd.ndjson') as writer:
+            for page in pages:
+                writer.write(xkcd.parse(page))
+
+        with NdjsonWriter(sys.stdout) as writer:
+            writer.write_many(xkcd.parse_concurrently(pages))
+    """
+
+    def __init__(self, fp_or_path, buffer_size=BUFFER_SIZE, sort_keys=False, ensure_ascii=False, mode='a'):
+        """
+        Args:
+            fp_or_path (file/str/Path): text or binary file object, which is not closed by the writer,
+                or a path opened with `mode`
+            buffer_size (int): buffered characters written at once
+            sort_keys (bool):
+            ensure_ascii (bool): escape non-ascii chars, off by default as lines are encoded as utf-8
+            mode (str): 'a' to append, 'w' to truncate, only for paths
+        """
+        if hasattr(fp_or_path, 'write'):
+            self._fp, self._own = fp_or_path, False
+        else:
+            self._fp, self._own = open(os.fspath(fp_or_path), mode + 'b'), True
+        self._binary = self._own or not hasattr(self._fp, 'encoding')
+        self._encode = json.JSONEncoder(
+            separators=(',', ':'), sort_keys=sort_keys, ensure_ascii=ensure_ascii, default=_json_default
+        ).encode
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._buffered = 0
+        self._lock = threading.Lock()
+        # documents written, including buffered ones
+        self.count = 0
+
+    def write(self, data):
+        """
+        Args:
+            data (dict/LazyData/IParser):
+        """
+        if hasattr(data, 'materialize'):
+            data = data.materialize()
+        line = self._encode(data) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered += len(line)
+            self.count += 1
+            if self._buffered >= self.buffer_size:
+                self._flush_buffer()
+
+    def write_many(self, items):
+        """
+        Args:
+            items (iterable): data, or (meta, data) tuples yielded by `parse_files`/`parse_concurrently`,
+                only data is written
+
+        Returns:
+            int: documents written
+        """
+        count = 0
+        for item in items:
+            self.write(item[-1] if isinstance(item, tuple) else item)
+            count += 1
+        return count
+
+    def _flush_buffer(self):
+        if not self._buffer:
+            return
+        chunk = ''.join(self._buffer)
+        self._fp.write(chunk.encode('utf-8') if self._binary else chunk)
+        self._buffer, self._buffered = [], 0
+
+    def flush(self):
+        with self._lock:
+            self._flush_buffer()
+        self._fp.flush()
+
+    def close(self):
+        self.flush()
+        if self._own:
+            self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
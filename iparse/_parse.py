@@ -3,25 +3,60 @@ __date__ = '12/06 10:17'
 __description__ = '''
 '''
 
+import collections
+import contextlib
 import dataclasses
+import functools
+import io
 import json
+import logging
+import mmap
+import os
 from pathlib import Path
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urlparse, urljoin, urlsplit
 import string
 import subprocess
+import sys
+import threading
 
 import yaml
-import logzero
 from logzero import logger as zlog
 from stringcase import snakecase, titlecase
 import bs4
-from bs4 import BeautifulSoup
+
+from iparse._aio import parse_stream
+from iparse._engine import SNIFF_SIZE, MapperStrainer, get_engine, sniff_encoding, strain_rule
+from iparse._json_stream import CHUNK_SIZE, iter_json_array
+from iparse._lazy import LazyData
+from iparse._log import ParserLogger
+from iparse._memo import ParseMemo
+from iparse._plan import (
+    DEFAULT_INDEX,
+    SELECT_ALL,
+    SELECT_CURRENT,
+    SELECT_EMPTY,
+    SELECT_FIRST,
+    SELECT_INVALID,
+    SELECT_TYPO,
+    InvalidIndex,
+    ParsePlan,
+    PlanNode,
+    bind_method,
+    index_filter,
+    iter_nodes,
+    prune_plan,
+)
+from iparse._pool import parse_concurrently, parse_files
+from iparse._profile import FieldProfiler
+from iparse._records import Columns, Record, _json_default, plain_data, record_class
+from iparse._refine import chain_refine, compile_pipeline
 
 __all__ = [
     'IParser',
     'IJsonParser',
     'IParserException',
     'RsvWords',
+    'clear_mapper_cache',
     'yaml_dump',
     'yaml_loader',
 ]
@@ -37,14 +72,23 @@ class RsvWords:
 
     attr: str = '_attr'
     attr_refine: str = '_attr_refine'
+    attr_refine_mode: str = '_attr_refine_mode'
     children: str = '_children'
     index: str = '_index'
     joiner: str = '_joiner'
     striped: str = '_striped'
     locator: str = '_locator'
     locator_extract: str = '_locator_extract'
+    refine: str = '_refine'
     prefix_extract = '_extract'
     prefix_refine = '_refine'
+    prefix_refine_many = '_refine_many'
+
+
+# libyaml's loader is several times faster than the pure python one
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# libyaml emitter, same data as yaml.Dumper, only long escaped strings are wrapped differently
+_YamlDumper = getattr(yaml, 'CDumper', yaml.Dumper)
 
 
 def yaml_loader(file_pth, raw_data=False):
@@ -59,13 +103,13 @@ def yaml_loader(file_pth, raw_data=False):
     """
     try:
         if raw_data:
-            return yaml.load(file_pth, Loader=yaml.FullLoader)
+            return yaml.load(file_pth, Loader=_YamlLoader)
 
         file_pth = Path(file_pth)
         if not file_pth.exists():
             raise IParserException('[NON-EXISTS]:{}'.format(file_pth))
         with open(file_pth, 'rb') as f:
-            return yaml.load(f, Loader=yaml.FullLoader)
+            return yaml.load(f, Loader=_YamlLoader)
     except Exception as e:
         return
 
@@ -79,7 +123,141 @@ def yaml_dump(msg_dict):
     Returns:
 
     """
-    return yaml.dump(msg_dict)
+    return yaml.dump(msg_dict, Dumper=_YamlDumper)
+
+
+class _ReadOnlyDict(dict):
+    """ dict shared among parser instances, any modification raises TypeError """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('{} is read-only'.format(self.__class__.__name__))
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+
+class _ReadOnlyList(list):
+    """ list shared among parser instances, any modification raises TypeError """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('{} is read-only'.format(self.__class__.__name__))
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = clear = extend = insert = pop = remove = reverse = sort = _readonly
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+
+# dumped as plain dict/list by `yaml.dump` and `yaml_dump`, which uses CDumper if available
+for _dumper in {yaml.Dumper, _YamlDumper}:
+    yaml.add_representer(_ReadOnlyDict, yaml.representer.SafeRepresenter.represent_dict, Dumper=_dumper)
+    yaml.add_representer(_ReadOnlyList, yaml.representer.SafeRepresenter.represent_list, Dumper=_dumper)
+
+
+def _freeze(dat):
+    if isinstance(dat, dict):
+        return _ReadOnlyDict((k, _freeze(v)) for k, v in dat.items())
+    if isinstance(dat, list):
+        return _ReadOnlyList(_freeze(x) for x in dat)
+    return dat
+
+
+def _merge_mapper(mapper, custom):
+    """ shallow merge custom into mapper, dict values are merged with one more level """
+    mapper = dict(mapper or {})
+    for _key in custom.keys():
+        if isinstance(custom[_key], dict):
+            mapper[_key] = dict(mapper.get(_key, {}), **custom.get(_key, {}))
+        else:
+            mapper[_key] = custom[_key]
+    return mapper
+
+
+# merged mappers shared by all instances: {(startup_dir, basic_yaml, startup_yaml): (mtimes, mapper)}
+_MAPPER_CACHE = collections.OrderedDict()
+_MAPPER_CACHE_SIZE = 128
+_MAPPER_CACHE_LOCK = threading.Lock()
+
+
+def _load_cached_mapper(startup_dir, basic_yaml, startup_yaml):
+    """
+    load basic yaml and site yaml, merge them, and cache the read-only result in a LRU
+
+    cache is invalidated once any yaml file's mtime changed
+
+    Returns:
+        (mapper, yaml files)
+    """
+    files = []
+    if basic_yaml:
+        files.append(startup_dir / basic_yaml)
+    _site_startup_yaml = startup_dir / '{}.yaml'.format(startup_yaml)
+    files.append(_site_startup_yaml)
+
+    key = (str(startup_dir), str(basic_yaml), str(startup_yaml))
+    mtimes = tuple(_file_mtime(x) for x in files)
+    with _MAPPER_CACHE_LOCK:
+        cached = _MAPPER_CACHE.get(key)
+        if cached and cached[0] == mtimes:
+            _MAPPER_CACHE.move_to_end(key)
+            return cached[1], files
+
+    mapper = {}
+    if basic_yaml:
+        mapper = yaml_loader(str(files[0]))
+    if not _site_startup_yaml.exists():
+        raise IParserException('site startup yaml ({}) not exists'.format(_site_startup_yaml))
+    mapper = _freeze(_merge_mapper(mapper, yaml_loader(_site_startup_yaml)))
+
+    with _MAPPER_CACHE_LOCK:
+        _MAPPER_CACHE[key] = (mtimes, mapper)
+        _MAPPER_CACHE.move_to_end(key)
+        while len(_MAPPER_CACHE) > _MAPPER_CACHE_SIZE:
+            _MAPPER_CACHE.popitem(last=False)
+    return mapper, files
+
+
+def clear_mapper_cache():
+    """ drop all cached mappers and compiled plans """
+    with _MAPPER_CACHE_LOCK:
+        _MAPPER_CACHE.clear()
+    with _PLAN_CACHE_LOCK:
+        _PLAN_CACHE.clear()
+
+
+def _is_document_object(obj):
+    """ open file, `mmap` or buffer, which should not be opened as a path """
+    return hasattr(obj, 'read') or isinstance(obj, (memoryview, bytearray))
+
+
+# encoding worked for each site: {snake_site_name: encoding}
+_SITE_ENCODINGS = {}
+
+# compiled plans shared by all instances: {(parser_class, mapper_files): (mtimes, plan)}
+_PLAN_CACHE = collections.OrderedDict()
+_PLAN_CACHE_SIZE = 128
+_PLAN_CACHE_LOCK = threading.Lock()
+
+# config based hooks of parsing before plans, subclasses overriding any of them are parsed by `_parse_dom`
+LEGACY_HOOKS = (
+    '_parse_dom',
+    '_get_node_elems',
+    'get_node_elems',
+    '_get_node_attrs',
+    '_get_elem_attrs',
+    '__refine_attr__',
+)
+
+
+def _file_mtime(file_pth):
+    try:
+        return Path(file_pth).stat().st_mtime_ns
+    except OSError:
+        return None
 
 
 class IParser(object):
@@ -111,11 +289,17 @@ class IParser(object):
         self.file_name = file_name
         self.raw_data = kwargs.get('raw_data', '')
         self.mapper = {}
+        # yaml files merged into mapper, None if mapper is customized with a dict
+        self._mapper_files = []
+        self._plan = None
         self.soup = None
         self.site_name = titlecase(self.__class__.__name__.replace('Parser', ''))
         self.snake_site_name = snakecase(self.__class__.__name__.replace('Parser', ''))
 
         self.log_level = kwargs.get('log_level', 10)
+        # level is checked by this logger, global logzero level is never changed
+        self.logger = ParserLogger(zlog, self.log_level)
+        self._debug = self.logger.isEnabledFor(logging.DEBUG)
         # convert startup_dir to PurePath
         self.startup_dir = Path(str(kwargs.get('startup_dir', '/tmp')))
         # a basic yaml is shared configs among all yaml files
@@ -129,18 +313,67 @@ class IParser(object):
         # bs4 basic configs
         self.encoding = kwargs.get('encoding', '')
         self.features = kwargs.get('features', 'lxml')
+        # bs4 or lxml, lxml works on lxml.html tree directly and requires cssselect
+        self.engine = kwargs.get('engine', 'bs4')
+        self._engine = get_engine(self.engine)
+        # only build sub trees matched by top level `_locator`s, fall back to whole tree if not possible
+        self.strain = kwargs.get('strain', False)
+        # keep document content in `raw_data` after soup is built, False to release it
+        self.keep_raw_data = kwargs.get('keep_raw_data', True)
+        # if encoding not set, sniff BOM/meta charset or use the encoding worked for this site
+        self.sniff_encoding = kwargs.get('sniff_encoding', True)
+        # `do_parse` only prepares a LazyData, each key is parsed when it is read
+        self.lazy = kwargs.get('lazy', False)
         self.reserved_yaml_keys = kwargs.get('reserved_yaml_keys', [])
         self.elems_default_index = kwargs.get('elems_default_index', 0)
         self.selected_keys = kwargs.get('selected_keys', [])
+        # True or a shared FieldProfiler, time and count every key path, see `profiler.report()`
+        _profile = kwargs.get('profile', False)
+        self.profiler = FieldProfiler() if _profile is True else (_profile or None)
+        # memoize selector and text results of same nodes within one document, see `memo_stats`
+        self.memo = kwargs.get('memo', False)
+        self.memo_stats = {}
+        self._memo = None
+        # output of list nodes: None for dicts, 'columns' for `Columns`, 'slots' for `__slots__` records
+        self.records = kwargs.get('records', None)
+        # dotted key paths, e.g. `top_container.top_left`, sibling sub trees not on the paths are never parsed
+        self.selected_paths = kwargs.get('selected_paths', [])
+        self._pruned_plan = None
+        # {(key, id(config)): (config, node, raw node)} of config based hooks, see `_legacy_node`
+        self._legacy_nodes = {}
+        self._default_index = index_filter(self.elems_default_index)
 
         # where our parsed data behold
         self._data = {}
+        # estimated bytes freed by last `release`
+        self.released_bytes = 0
         self._spawn()
 
+    def __copy__(self):
+        """ shallow copy without document, sharing mapper and compiled plan, e.g. copy of each thread """
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone.soup, clone.raw_data, clone._data, clone._memo = None, '', {}, None
+        return clone
+
+    def __getstate__(self):
+        """ pickled without document and compiled callables, e.g. to be sent to a process executor """
+        state = dict(self.__dict__)
+        for key in ('soup', 'raw_data', '_plan', '_pruned_plan', '_default_index', '_memo', '_legacy_nodes'):
+            state.pop(key, None)
+        state['_data'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.soup, self.raw_data, self._plan, self._pruned_plan, self._memo = None, '', None, None, None
+        self._legacy_nodes = {}
+        self._default_index = index_filter(self.elems_default_index)
+
     def __str__(self):
         _base = '{}\n'.format(self.__class__.__name__)
         for key, val in self.__dict__.items():
-            if isinstance(val, bs4.Tag):
+            if isinstance(val, (bs4.Tag,) + self._engine.node_types):
                 continue
             _base += '{:>16}: {}\n'.format(key, val)
         return _base
@@ -150,20 +383,53 @@ class IParser(object):
         self.pre_init()
         # load basic mapper
         self.load_mapper()
-        self.init_soup()
+        if self.selected_paths:
+            # invalid paths raise here, instead of on parsing
+            self.selected_plan
+        if self.records:
+            self._check_records()
+        # without document, soup is built when `parse` is called
+        if self.file_name or self.raw_data:
+            self.init_soup()
         self.post_init()
 
+    def _check_records(self):
+        if self.records not in ('columns', 'slots'):
+            raise IParserException('records should be None, columns or slots, got ({})'.format(self.records))
+        if self.records == 'slots':
+            for node in iter_nodes(self.plan.nodes):
+                if not node.children:
+                    continue
+                try:
+                    record_class(node.fields)
+                except ValueError as e:
+                    raise IParserException('{}: {}'.format(node.path, e))
+
     def pre_init(self):
-        logzero.loglevel(self.log_level)
-        self.reserved_yaml_keys += dataclasses.astuple(RsvWords())
+        # never extend the list in place, it may be shared by other parsers through kwargs
+        self.reserved_yaml_keys = list(self.reserved_yaml_keys) + list(dataclasses.astuple(RsvWords()))
 
     def post_init(self):
-        _test_keys = self.mapper.get('__raw', {}).pop('test_keys', []) or []
-        self.test_keys += _test_keys
+        # mapper is shared among instances, so never pop from it
+        _test_keys = self.mapper.get('__raw', {}).get('test_keys', []) or []
+        self.test_keys = list(self.test_keys) + list(_test_keys)
 
     def load_mapper(self):
+        """
+        load mapper from basic yaml and site yaml
+
+        the merged mapper is cached process-wide and shared read-only by all instances,
+        unless `startup_yaml_config` is supplied
+        """
+        if not self.startup_yaml_config:
+            self.mapper, self._mapper_files = _load_cached_mapper(self.startup_dir, self.basic_yaml, self.startup_yaml)
+            self._plan = None
+            return
+
         if self.basic_yaml:
-            self.mapper = yaml_loader(str(self.startup_dir / self.basic_yaml))
+            _basic_yaml = self.startup_dir / self.basic_yaml
+            self.mapper = yaml_loader(str(_basic_yaml))
+            self._mapper_files.append(_basic_yaml)
         self.customize_with_file(self.startup_yaml)
 
     def customize_with_file(self, file_name):
@@ -179,13 +445,14 @@ class IParser(object):
         """
         if self.startup_yaml_config:
             _custom = self.startup_yaml_config
+            self._mapper_files = None
         else:
             _custom = self._load_yaml_config(file_name)
-        for _key in _custom.keys():
-            if isinstance(_custom[_key], dict):
-                self.mapper[_key] = dict(self.mapper.get(_key, {}), **_custom.get(_key, {}))
-            else:
-                self.mapper[_key] = _custom[_key]
+            if self._mapper_files is not None:
+                self._mapper_files.append(self.startup_dir / '{}.yaml'.format(file_name))
+        # mapper changed, plan should be compiled again
+        self._plan = None
+        self.mapper = _merge_mapper(self.mapper, _custom)
 
     def _load_yaml_config(self, file_name):
         _site_startup_yaml = self.startup_dir / '{}.yaml'.format(file_name)
@@ -204,32 +471,226 @@ class IParser(object):
         """
         if raw_data:
             self.raw_data = raw_data
-        if not self.raw_data:
-            with open(self.file_name, 'rb') as fp:
-                self.raw_data = fp.read()
 
-        params = dict(
-            features=self.features,
-        )
-        if self.encoding:
-            params['from_encoding'] = self.encoding
-        try:
-            self.soup = BeautifulSoup(self.raw_data, **params)
-        except bs4.FeatureNotFound:
-            params['features'] = 'html.parser'
-            self.soup = BeautifulSoup(self.raw_data, **params)
+        parse_only = self._strainer() if self.strain else None
+        with self._open_document() as document:
+            encoding = self.encoding or self._sniff_encoding(document)
+            self.soup = self._engine.build(document, features=self.features, encoding=encoding, parse_only=parse_only)
+        if not self.keep_raw_data:
+            self.raw_data = ''
+
+        if not self.encoding and self.sniff_encoding and self._engine.sniff_encoding:
+            # remember what actually worked, bs4 falls back to full detection if sniffed encoding failed
+            used = self._engine.used_encoding(self.soup)
+            if used:
+                _SITE_ENCODINGS[self.snake_site_name] = used
+
+    def _sniff_encoding(self, document):
+        """
+        encoding of bytes document, used as `from_encoding`:
+
+            1. BOM or meta charset in the first few KB
+            2. encoding worked for previous documents of this site, engine falls back to full detection
+               if the document can not be decoded with it, and `init_soup` remembers the one used
+
+        Returns:
+            str: '' if engine detects encoding by itself, or nothing found, then the engine guesses
+        """
+        if not (self.sniff_encoding and self._engine.sniff_encoding):
+            return ''
+        if not isinstance(document, (bytes, bytearray, memoryview, mmap.mmap)):
+            return ''
+
+        encoding = sniff_encoding(bytes(document[:SNIFF_SIZE]))
+        if encoding:
+            return encoding
+
+        return _SITE_ENCODINGS.get(self.snake_site_name, '')
+
+    def _open_document(self):
+        """
+        document to build soup from, `raw_data` first, then `file_name`
+
+            - str/bytes, open binary file, `mmap` or `memoryview` is passed to engine as is
+            - file path is read into `raw_data`, or opened and passed to engine if not `keep_raw_data`
+
+        Returns:
+            context manager of the document
+        """
+        if self.raw_data:
+            return contextlib.nullcontext(self.raw_data)
+        if _is_document_object(self.file_name):
+            return contextlib.nullcontext(self.file_name)
+        if not self.file_name:
+            # e.g. `parse(b'')`, which should not be opened as path ''
+            raise IParserException('empty document, neither raw_data nor file_name is supplied')
+        if not self.keep_raw_data:
+            return open(self.file_name, 'rb')
+
+        with open(self.file_name, 'rb') as fp:
+            self.raw_data = fp.read()
+        return contextlib.nullcontext(self.raw_data)
+
+    def parse(self, raw_or_path=None, release=False, raw=None):
+        """
+        parse a new document with this parser, mapper and compiled plan are kept between calls
+
+        e.g.:
+            parser = XkcdParser()
+            for page in pages:
+                data = parser.parse(page)
+            data = parser.parse(raw='<html>...</html>')
+
+        Args:
+            raw_or_path (str/Path/bytes/file/mmap/memoryview): str or path-like object is a file path, as `file_name`,
+                bytes/open binary file/mmap/memoryview are document content
+            release (bool): free document tree and raw content once parsed, see `release`
+            raw (str/bytes): document content, e.g. markup as str
+
+        Returns:
+            dict: parsed data of this document
+        """
+        if raw is not None:
+            if raw_or_path is not None:
+                raise IParserException('only one of raw_or_path and raw should be supplied')
+            self.file_name, self.raw_data = '', raw
+        elif raw_or_path is None:
+            raise IParserException('raw_or_path or raw is required')
+        elif isinstance(raw_or_path, (str, os.PathLike)):
+            self.file_name, self.raw_data = raw_or_path, ''
+        else:
+            self.file_name, self.raw_data = '', raw_or_path
+
+        self.soup = None
+        self._data = {}
+        self.init_soup()
+        self.do_parse(release=release)
+        return self._data
+
+    def release(self):
+        """
+        free document tree and raw content, only parsed data is kept, so rss of long running workers stays flat
+
+            - bs4 tree is decomposed, lxml tree is cleared, instead of waiting for gc
+            - lazy data is materialized first
+
+        Returns:
+            int: estimated bytes freed, also kept in `released_bytes`
+        """
+        if isinstance(self._data, LazyData):
+            self._data = self._data.materialize()
+
+        freed = 0
+        if isinstance(self.raw_data, (str, bytes, bytearray)) and self.raw_data:
+            freed += sys.getsizeof(self.raw_data)
+        if self.soup is not None:
+            freed += self._release_soup(self.soup)
+        self.soup, self.raw_data = None, ''
+        self.released_bytes = freed
+        if self._debug:
+            self.logger.debug('[RELEASED]: %s bytes', freed)
+        return freed
+
+    def _release_soup(self, soup):
+        return self._engine.release(soup)
+
+    def close(self):
+        """ same as `release`, parser can still parse new documents after closed """
+        return self.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @classmethod
+    def parse_files(cls, paths, workers=None, chunksize=1, ordered=True, **kwargs):
+        """
+        parse files across a process pool, see `iparse.parse_files` for all options
+
+        e.g.:
+            for path, data in XkcdParser.parse_files(paths, workers=4, max_tasks_per_worker=500):
+                ...
+
+        Args:
+            paths (iterable): files to parse
+            workers (int): number of processes, default is cpu count
+            chunksize (int): documents sent to a worker at once
+            ordered (bool): yield in input order if True, else in completion order
+            **kwargs: max_tasks_per_worker/max_rss, and kwargs to build parser
+
+        Yields:
+            (path, data)
+        """
+        return parse_files(cls, paths, workers=workers, chunksize=chunksize, ordered=ordered, **kwargs)
+
+    def parse_concurrently(self, docs, threads=None):
+        """
+        parse documents across a thread pool, each thread parses with its own copy of this parser,
+        see `iparse.parse_concurrently`
+
+        e.g.:
+            xkcd = XkcdParser(engine='lxml')
+            for data in xkcd.parse_concurrently(pages, threads=4):
+                ...
+
+        Args:
+            docs (iterable): anything accepted by `parse`
+            threads (int): number of threads, default is cpu count
+
+        Yields:
+            data of each document, in input order
+        """
+        return parse_concurrently(self, docs, threads=threads)
+
+    def parse_stream(self, docs, concurrency=4, executor=None, ordered=True):
+        """
+        parse documents from asyncio code in an executor with bounded concurrency, see `iparse.parse_stream`
+
+        e.g.:
+            async for url, data in xkcd.parse_stream(fetch_pages(urls), concurrency=8):
+                ...
+
+        Args:
+            docs (iterable/async iterable): anything accepted by `parse`, or (meta, doc) tuples
+            concurrency (int): documents parsed at the same time
+            executor (Executor/None): thread pool by default
+            ordered (bool): yield in input order if True, else in completion order
+
+        Returns:
+            async generator of (meta, data)
+        """
+        return parse_stream(self, docs, concurrency=concurrency, executor=executor, ordered=ordered)
 
     @property
     def data(self):
         return self._data
 
+    def materialize(self):
+        """ parsed data as plain dict, all keys are parsed if parser is lazy """
+        if isinstance(self._data, LazyData):
+            return self._data.materialize()
+        return self._data
+
     @property
     def data_as_json(self):
-        return json.dumps(self._data, indent=2, sort_keys=True)
+        return json.dumps(self.materialize(), indent=2, sort_keys=True, default=_json_default)
+
+    @property
+    def data_as_compact_json(self):
+        """ one line json without whitespace, keys in parsed order """
+        return json.dumps(self.materialize(), separators=(',', ':'), default=_json_default)
+
+    @property
+    def data_as_sorted_json(self):
+        """ compact json with sorted keys, same data always dumps to same string, e.g. to diff or hash """
+        return json.dumps(self.materialize(), separators=(',', ':'), sort_keys=True, default=_json_default)
 
     @property
     def data_as_yaml(self):
-        return yaml_dump(self._data)
+        data = self.materialize()
+        return yaml_dump(plain_data(data) if self.records else data)
 
     @staticmethod
     def shift(dat):
@@ -253,55 +714,361 @@ class IParser(object):
             use_json: default true
             kwargs: all json dumps supported
         """
-        data = dat or self._data
+        data = dat or self.materialize()
         if use_json:
+            kwargs.setdefault('default', _json_default)
             data = json.dumps(data, **kwargs)
         self.copy_to_clipboard(data)
         return data
 
-    def do_parse(self):
-        for dom_key, dom_config in self.mapper.items():
-            if dom_key.startswith('__'):
-                continue
+    """ compile mapper into plan """
+
+    @property
+    def plan(self):
+        """ compiled plan of mapper, shared by all instances of same class with same yaml files """
+        if self._plan is None:
+            self._plan = self._load_plan()
+        return self._plan
+
+    @property
+    def selected_plan(self):
+        """ plan pruned by `selected_paths`, with timed extract/refine if profiling """
+        plan = self.plan
+        if self.selected_paths:
+            if self._pruned_plan is None or self._pruned_plan[0] is not plan:
+                pruned, invalid = prune_plan(plan, self.selected_paths)
+                if invalid:
+                    raise IParserException('[INVALID-PATHS] {} not found in mapper'.format(invalid))
+                self._pruned_plan = (plan, pruned)
+            plan = self._pruned_plan[1]
+
+        if self.profiler is not None:
+            return self.profiler.wrap_plan(plan)
+        return plan
+
+    def _load_plan(self):
+        if not self._mapper_files:
+            return self.compile_plan(self.mapper)
+
+        cache_key = (self.__class__, tuple(str(x) for x in self._mapper_files))
+        mtimes = tuple(_file_mtime(x) for x in self._mapper_files)
+        with _PLAN_CACHE_LOCK:
+            cached = _PLAN_CACHE.get(cache_key)
+            if cached and cached[0] == mtimes:
+                _PLAN_CACHE.move_to_end(cache_key)
+                return cached[1]
+
+        plan = self.compile_plan(self.mapper)
+        with _PLAN_CACHE_LOCK:
+            _PLAN_CACHE[cache_key] = (mtimes, plan)
+            _PLAN_CACHE.move_to_end(cache_key)
+            while len(_PLAN_CACHE) > _PLAN_CACHE_SIZE:
+                _PLAN_CACHE.popitem(last=False)
+        return plan
+
+    @classmethod
+    def compile_plan(cls, mapper):
+        """
+        walk mapper once, and turn every key into an immutable `PlanNode`
+
+        keys startswith `__` are yaml anchors/raw settings, so they are never compiled
+
+        Args:
+            mapper (dict):
+
+        Returns:
+            ParsePlan
+        """
+        nodes = [cls._compile_node(key, config, key) for key, config in mapper.items() if not key.startswith('__')]
+        if cls.legacy_hooks():
+            nodes = [dataclasses.replace(x, legacy=True) for x in nodes]
+        return ParsePlan(nodes=tuple(nodes))
+
+    @classmethod
+    def legacy_hooks(cls):
+        """ `LEGACY_HOOKS` overridden by subclasses outside iparse, e.g. `_get_elem_attrs` """
+        return [
+            name
+            for name in LEGACY_HOOKS
+            if any(name in klass.__dict__ for klass in cls.__mro__ if klass.__module__ != __name__)
+        ]
+
+    @classmethod
+    def _compile_node(cls, key, config, path=''):
+        path = path or key
+        if not isinstance(config, dict):
+            return PlanNode(key=key, config=config, path=path, select=cls._compile_select(config))
+
+        children = [
+            cls._compile_node(_key, _config, '{}.{}'.format(path, _key))
+            for _key, _config in config.items()
+            if not _key.startswith('_')
+        ]
+
+        _locator_extract = config.get(RsvWords.locator_extract)
+        extract = None
+        if _locator_extract is True:
+            # gn4.2 if is true => auto-generate _extract_<key_name>
+            _locator_extract = '{}_{}'.format(RsvWords.prefix_extract, key)
+        if _locator_extract:
+            # gn4.1/4.2: str/bool
+            extract = bind_method(cls, _locator_extract)
+
+        index = DEFAULT_INDEX
+        if RsvWords.index in config:
+            index = index_filter(config[RsvWords.index])
+
+        refine_many = cls._compile_refine_many(key, config)
+        pipeline = cls._compile_pipeline(path, config)
+        if refine_many and pipeline:
+            raise IParserException('{}: {} can not be used with batch refine'.format(path, RsvWords.refine))
+
+        return PlanNode(
+            key=key,
+            config=config,
+            path=path,
+            children=tuple(children),
+            select=cls._compile_select(config),
+            locator=config.get(RsvWords.locator),
+            extract=extract,
+            index=index,
+            text_only=False,
+            attrs=config.get(RsvWords.attr),
+            joiner=config.get(RsvWords.joiner, ''),
+            striped=config.get(RsvWords.striped, False),
+            refine=None if refine_many else chain_refine(cls._compile_refine(key, config), pipeline),
+            refine_many=refine_many,
+        )
+
+    @staticmethod
+    def _compile_select(config):
+        # gn1. first of all: if config is None, means use current node
+        if config is None:
+            return SELECT_CURRENT
+        if not config:
+            return SELECT_EMPTY
+        # gn2. simple str, select and return
+        if isinstance(config, str):
+            return SELECT_FIRST
+        if not isinstance(config, dict):
+            return SELECT_INVALID
+
+        # gn3. config is dict
+        # gn3.1 _locator is None, use current node
+        _locator = config.get(RsvWords.locator)
+        if _locator is None:
+            return SELECT_CURRENT
+        # gn3.2 in case if you mistakenly add `_locator: ''` or things like this
+        if not _locator:
+            return SELECT_TYPO
+        return SELECT_ALL
+
+    @classmethod
+    def _compile_refine(cls, key, config):
+        """
+        ga4.1 non refine
+        ga4.2 if attr_refine is str, just use it
+        ga4.3 else auto parse it
+
+        when _attr is `ga3.1.1`
+        image_1:
+            _attr:
+              - src
+              - alt
+            _attr_refine: true
+            _locator: span>a>img
+
+        image_2:
+            _locator: span>a>img
+            src:
+              _attr: src
+              _attr_refine: _refine_image_1_src
+            alt:
+              _attr: alt
+        """
+        # ga4.1 non-refine
+        _attr_refine = config.get(RsvWords.attr_refine)
+        if not _attr_refine:
+            return None
+
+        _attrs = config.get(RsvWords.attr)
+        # ga4.2 raw is dict, means _attr is `ga3.1.1`
+        if _attrs and isinstance(_attrs, list):
+            if _attr_refine is True:
+                _attr_refine = '{}_{}'.format(RsvWords.prefix_refine, key)
+            refines = {k: bind_method(cls, '{}_{}'.format(_attr_refine, k)) for k in _attrs}
+            return lambda parser, raw: {k: refines[k](parser, v) for k, v in raw.items()}
+
+        # ga4.3 raw is normal str
+        if _attr_refine is True:
+            _attr_refine = cls._auto_refine_name(key, config)
+        return bind_method(cls, _attr_refine)
+
+    @classmethod
+    def _compile_pipeline(cls, path, config):
+        """
+        `_refine` steps of built-in refiners, run after `_attr_refine` if both set, see `iparse._refine`
+
+        ```yaml
+        followers:
+          _locator: span.followers
+          _refine: [collapse_ws, enrich_dot_k_int]
+        link:
+          _attr: href
+          _refine:
+            - strip
+            - {enrich_url: 'https://example.com/'}
+        ```
+        """
+        steps = config.get(RsvWords.refine)
+        if not steps:
+            return None
+        if isinstance(config.get(RsvWords.attr), list):
+            raise IParserException('{}: {} of multiple {} is not supported'.format(path, RsvWords.refine, RsvWords.attr))
+        try:
+            return compile_pipeline(cls, steps)
+        except (ValueError, TypeError) as e:
+            raise IParserException('{}: {}'.format(path, e))
 
+    @classmethod
+    def _auto_refine_name(cls, key, config, prefix=RsvWords.prefix_refine):
+        """ method name of `_attr_refine: true`, e.g. `_refine_<key>` or `_refine_<key>_<attr>` """
+        _attrs = config.get(RsvWords.attr)
+        _fmt = '{}_{}'
+        if isinstance(_attrs, str):
+            _fmt = '{}_{}_{}'
+        # only keep characters allowed by python function names
+        return cls.keep_allowed_chars(_fmt.format(prefix, key, _attrs), replace_with='')
+
+    @classmethod
+    def _compile_refine_many(cls, key, config):
+        """
+        batch refine, called once with raw values of all elems of the key, instead of once for each elem,
+        e.g. to run one regex pass or a numpy conversion over a long list
+
+            - `_attr_refine_mode: batch`: method of `_attr_refine` takes the list, `true` means `_refine_many_<key>`
+            - `_attr_refine: true` and a `_refine_many_<key>` method is defined on the parser
+
+        ```yaml
+        prices:
+          _locator: span.price
+          _index: ~
+          _attr_refine: true  # def _refine_many_prices(self, raws): return [...]
+        links:
+          _locator: a
+          _index: ~
+          _attr: href
+          _attr_refine: enrich_url_many
+          _attr_refine_mode: batch
+        ```
+        """
+        _attr_refine = config.get(RsvWords.attr_refine)
+        _mode = config.get(RsvWords.attr_refine_mode, 'each')
+        if _mode not in ('each', 'batch'):
+            raise IParserException('{} should be each or batch, got ({})'.format(RsvWords.attr_refine_mode, _mode))
+        if not _attr_refine:
+            return None
+
+        if isinstance(config.get(RsvWords.attr), list):
+            if _mode == 'batch':
+                raise IParserException('{}: batch refine of multiple {} is not supported'.format(key, RsvWords.attr))
+            return None
+
+        if _attr_refine is True:
+            _attr_refine = cls._auto_refine_name(key, config, RsvWords.prefix_refine_many)
+            if _mode != 'batch' and not hasattr(cls, _attr_refine):
+                return None
+        elif _mode != 'batch':
+            return None
+        return bind_method(cls, _attr_refine)
+
+    def do_parse(self, release=False):
+        """
+        Args:
+            release (bool): free document tree and raw content once parsed, see `release`
+        """
+        self._default_index = index_filter(self.elems_default_index)
+        # `log_level` may be changed after init, level check is hoisted out of the recursion
+        self.logger.level = self.log_level
+        self._debug = self.logger.isEnabledFor(logging.DEBUG)
+        memo = ParseMemo() if self.memo else None
+        if self.lazy:
+            # lazy data owns the memo of its document, `memo_stats` is set once all its keys are parsed
+            self.memo_stats = {}
+            self._data = LazyData(self, self._evaluated_nodes(self.selected_plan), self.soup, memo)
+        else:
+            self._memo = memo
+            try:
+                for node in self._evaluated_nodes(self.selected_plan):
+                    self._run_node(node, self.soup, self._data)
+            finally:
+                self._clear_memo()
+        if release:
+            self.release()
+
+    def _clear_memo(self):
+        memo, self._memo = self._memo, None
+        if memo is None:
+            return
+        self.memo_stats = memo.stats()
+        if self._debug:
+            self.logger.debug('[MEMO] %s', self.memo_stats)
+        memo.clear()
+
+    def _evaluated_nodes(self, plan, verbose=True):
+        """ top level nodes which will be parsed """
+        for node in plan.nodes:
+            dom_key, dom_config = node.key, node.config
             if dom_key in self.reserved_yaml_keys:
-                zlog.error('[RESERVED-KEYS] ({})'.format(dom_key))
+                if verbose:
+                    self.logger.error('[RESERVED-KEYS] (%s)', dom_key)
                 continue
 
             if not isinstance(dom_config, dict):
-                zlog.error('[PLAIN-TYPE] {}:{}, please move inside page'.format(dom_key, dom_config))
+                if verbose:
+                    self.logger.error('[PLAIN-TYPE] %s:%s, please move inside page', dom_key, dom_config)
                 continue
 
             if all([self.is_test_mode, self.test_keys, dom_key not in self.test_keys]):
-                zlog.debug('[SKIPPED-KEYS] ({})'.format(dom_key))
+                if verbose:
+                    self.logger.debug('[SKIPPED-KEYS] (%s)', dom_key)
                 continue
 
             if all([self.selected_keys, dom_key not in self.selected_keys]):
-                zlog.info(f"[SKIPPED-KEYS] ({dom_key})")
+                if verbose:
+                    self.logger.info('[SKIPPED-KEYS] (%s)', dom_key)
                 continue
 
-            self._parse_dom(dom_key, dom_config, self.soup, self._data)
+            yield node
 
-        # reset logzero level to 10
-        logzero.loglevel(10)
+    def _strainer(self):
+        """
+        build a strainer with top level `_locator`s, so only matched sub trees are built
 
-    """ operation on DOMs """
+        Returns:
+            MapperStrainer, None if any top level node can not be expressed as strainer
+        """
+        rules = []
+        for node in self._evaluated_nodes(self.selected_plan, verbose=False):
+            if node.select != SELECT_ALL:
+                return None
+            locators = node.locator if isinstance(node.locator, list) else [node.locator]
+            for locator in locators:
+                if not isinstance(locator, str):
+                    return None
+                for selector in locator.split(','):
+                    rule = strain_rule(selector)
+                    if rule is None:
+                        return None
+                    rules.append(rule)
+        return MapperStrainer(rules) if rules else None
 
-    def dom_with_sub_nodes(self, config):
-        """ if all key startswith _, means all reserved keys, leaf node """
-        sub_node = []
-        if isinstance(config, dict):
-            sub_node = [k for k, _ in config.items() if not k.startswith('_')]
-        return sub_node
+    """ operation on DOMs """
 
     def _parse_dom(self, key, config, nodes, dat):
         """
-        parse html dom with recursion of `_parse_dom/_parse_dom_nodes`
-
-        two end conditions:
-            1. config is str
-            2. no child in config dom nodes
-            3. nodes not exist
+        parse html dom with recursion of config based hooks, only used if a subclass overrides any of `LEGACY_HOOKS`,
+        so overrides are called as before plans, but `records` is not supported
 
         Args:
             key (str):
@@ -309,31 +1076,112 @@ class IParser(object):
             nodes (Tag/list):
             dat (dict):
         """
-        if not self.dom_with_sub_nodes(config):
+        plan = self._legacy_node(key, config)[0]
+        if not plan.children:
             dat[key] = self._get_node_attrs(key, config, nodes)
             return
 
         nodes = self._get_node_elems(key, config, nodes)
         # nodes not exists
         if not nodes:
-            zlog.debug("[NON-NODES] ('{}': {})".format(key, config))
+            if self._debug:
+                self.logger.debug("[NON-NODES] ('%s': %s)", key, config)
             return
 
         if isinstance(nodes, list):
-            dat.setdefault(key, [])
+            items = dat.setdefault(key, [])
             for node in nodes:
                 sub_dat = {}
-                self._parse_dom_nodes(config, node, sub_dat)
-                dat[key].append(sub_dat)
+                for child in plan.children:
+                    self._parse_dom(child.key, child.config, node, sub_dat)
+                items.append(sub_dat)
         else:
-            dat.setdefault(key, {})
-            self._parse_dom_nodes(config, nodes, dat[key])
+            sub_dat = dat.setdefault(key, {})
+            for child in plan.children:
+                self._parse_dom(child.key, child.config, nodes, sub_dat)
 
-    def _parse_dom_nodes(self, children, node, dat):
-        for _key, _config in children.items():
-            if _key.startswith('_'):
-                continue
-            self._parse_dom(_key, _config, node, dat)
+    def _legacy_node(self, key, config):
+        """
+        compiled node of (key, config) for config based hooks, the sub tree is compiled once and cached
+
+        Returns:
+            (PlanNode, same PlanNode without refine), the latter gives raw values for `__refine_attr__`
+        """
+        cached = self._legacy_nodes.get((key, id(config)))
+        if cached is None or cached[0] is not config:
+            for node in iter_nodes([self._compile_node(key, config)]):
+                raw_node = dataclasses.replace(node, refine=None, refine_many=None)
+                # config is kept, so its id is never reused meanwhile
+                self._legacy_nodes[(node.key, id(node.config))] = (node.config, node, raw_node)
+            cached = self._legacy_nodes[(key, id(config))]
+        return cached[1:]
+
+    def _run_node(self, plan, nodes, dat):
+        """
+        parse html dom with recursion of plan nodes
+
+        two end conditions:
+            1. config is str
+            2. no child in config dom nodes
+            3. nodes not exist
+
+        Args:
+            plan (PlanNode):
+            nodes (Tag/list):
+            dat (dict):
+        """
+        if plan.legacy:
+            self._parse_dom(plan.key, plan.config, nodes, dat)
+            return
+        if not plan.children:
+            dat[plan.key] = self._run_leaf(plan, nodes)
+            return
+
+        if self.profiler is None:
+            nodes = self._select_node_elems(plan, nodes)
+        else:
+            nodes = self.profiler.select(self, plan, nodes)
+        # nodes not exists
+        if not nodes:
+            if self._debug:
+                self.logger.debug("[NON-NODES] ('%s': %s)", plan.key, plan.config)
+            return
+
+        if isinstance(nodes, list):
+            if self.records is not None:
+                dat[plan.key] = self._run_records(plan, nodes)
+                return
+            items = dat.setdefault(plan.key, [])
+            for node in nodes:
+                sub_dat = {}
+                for child in plan.children:
+                    self._run_node(child, node, sub_dat)
+                items.append(sub_dat)
+        else:
+            # containers inside records are repeated for each item, so they are records too
+            sub_dat = dat.setdefault(plan.key, record_class(plan.fields)() if isinstance(dat, Record) else {})
+            for child in plan.children:
+                self._run_node(child, nodes, sub_dat)
+
+    def _run_records(self, plan, nodes):
+        """ items of a list node as `Columns` or `__slots__` records, see `records` """
+        if self.records == 'slots':
+            record_cls = record_class(plan.fields)
+            items = []
+            for node in nodes:
+                record = record_cls()
+                for child in plan.children:
+                    self._run_node(child, node, record)
+                items.append(record)
+            return items
+
+        items = Columns(plan.fields)
+        for node in nodes:
+            sub_dat = {}
+            for child in plan.children:
+                self._run_node(child, node, sub_dat)
+            items.append(sub_dat)
+        return items
 
     """ how we find and parse attributes """
 
@@ -384,7 +1232,16 @@ class IParser(object):
             if self.is_test_mode:
                 raise IParserException(e)
             else:
-                zlog.exception(e)
+                self.logger.exception(e)
+
+    def _select_node_elems(self, plan, node=None):
+        try:
+            return self._select_plan_elems(plan, node)
+        except Exception as e:
+            if self.is_test_mode:
+                raise IParserException(e)
+            else:
+                self.logger.exception(e)
 
     def _handle_soup_key(self, key):
         if not isinstance(key, str) and not isinstance(key, list):
@@ -394,7 +1251,10 @@ class IParser(object):
         return key
 
     def _get_single_node_value(self, node, locator):
-        return getattr(node, 'select')(locator)
+        # selector is compiled only once, then reused for every node
+        if self._memo is None:
+            return self._engine.select(node, locator, node is self.soup)
+        return self._memo.select(self._engine, node, locator, node is self.soup)
 
     def select_soup_node_elems(self, node, locator, multiple=True):
         locators = self._handle_soup_key(locator)
@@ -408,84 +1268,63 @@ class IParser(object):
         return elems[0] if elems else elems
 
     def get_node_elems(self, key, config, node=None, **kwargs):
+        return self._select_plan_elems(self._legacy_node(key, config)[0], node)
+
+    def _select_plan_elems(self, plan, node=None):
         node = node or self.soup
+        select = plan.select
 
         # gn1. first of all: if config is None, means use current node
-        if config is None:
+        # gn3.1 _locator is None, use current node
+        if select == SELECT_CURRENT:
             return node
 
-        if not config:
-            raise Exception(f"[Err] _locator({key}:{config})'s value can not be empty")
-
         # gn2. simple str, select and return
-        if isinstance(config, str):
-            elems = self.select_soup_node_elems(node, config, multiple=False)
-            return elems
+        if select == SELECT_FIRST:
+            return self.select_soup_node_elems(node, plan.config, multiple=False)
 
-        # gn3. config is dict
-        # gn3.1 _locator is None, use current node
-        _locator = config.get(RsvWords.locator)
-        if _locator is None:
-            return node
+        if select == SELECT_EMPTY:
+            raise Exception(f"[Err] _locator({plan.key}:{plan.config})'s value can not be empty")
+        if select == SELECT_INVALID:
+            raise Exception(f"[Err] _locator({plan.key}:{plan.config}) type only supported: [None, str, dict]")
 
         # gn3.2 in case if you mistakenly add `_locator: ''` or things like this
-        if not _locator:
-            zlog.warning(
-                '[TYPO] please use `_locator: ~` or `remove _locator` instead of ({},{},{})'.format(
-                    key, config, _locator
-                )
+        if select == SELECT_TYPO:
+            self.logger.warning(
+                '[TYPO] please use `_locator: ~` or `remove _locator` instead of (%s,%s,%s)',
+                plan.key,
+                plan.config,
+                plan.locator,
             )
             return node
 
-        elems = self.select_soup_node_elems(node, _locator)
+        elems = self.select_soup_node_elems(node, plan.locator)
         # gn4. with _locator_extract
-        _locator_extract = config.get(RsvWords.locator_extract)
-        elems = self.__extract_elems(key, _locator_extract, elems)
+        if plan.extract is not None:
+            elems = plan.extract(self, elems)
         if not elems:
             return None
 
         # gn5. get all or just specified
-        elems = self.__filter_specified_elems(elems, config)
-        return elems
+        return self._filter_plan_elems(plan, elems)
 
-    def __extract_elems(self, key, _locator_extract, elems):
-        # TODO: find if _extract need list structure
-        # gn4.1 _locator_extract is str, just use it.
-        if _locator_extract is True:
-            # gn4.2 if is true => auto-generate _extract_<key_name>
-            _locator_extract = '{}_{}'.format(RsvWords.prefix_extract, key)
-        if _locator_extract:
-            # gn4.1/4.2: str/bool
-            elems = getattr(self, _locator_extract)(elems)
-
-        return elems
-
-    def __filter_specified_elems(self, elems, config):
+    def _filter_plan_elems(self, plan, elems):
         # index: None = all, int = only one, list = range
-        index = config.get(RsvWords.index, self.elems_default_index)
-        # gn5.1 `index: ~`
+        index = plan.index
+        if index is DEFAULT_INDEX:
+            index = self._default_index
         if index is None:
             return elems
-        # gn5.2 `index: <int>`
-        if isinstance(index, int):
-            index = min(index, len(elems) - 1)
-            return elems[index]
-        # gn5.3 `index: <list>`
-        if isinstance(index, list):
-            if len(index) == 1:
-                return elems[index[0] :]
-            else:
-                return elems[index[0] : index[-1]]
 
-        # gn5.4 `index: non-previous value`
-        if self.is_test_mode:
-            raise IParserException('error type of {} index({})'.format(config, index))
-        else:
-            zlog.exception('[ERROR-TYPE] type of {} index({})'.format(config, index))
-        return elems
-
-    def _get_nodes_attrs(self, key, config, node=None, **kwargs):
-        return [self._get_node_attrs(key, config, _node) for _node in node]
+        try:
+            return index(elems)
+        except InvalidIndex as e:
+            # gn5.4 `index: non-previous value`
+            if self.is_test_mode:
+                raise IParserException('{} of {}'.format(e, plan.config))
+            else:
+                self.logger.exception('[ERROR-TYPE] %s of %s', e, plan.config)
+            return elems
 
     def _get_node_attrs(self, key, config, node=None, **kwargs):
         """
@@ -504,12 +1343,13 @@ class IParser(object):
 
         # in case got node list
         if isinstance(node, list):
-            zlog.warning('[MULTIPLE-NODE]type of node is list: {}{}'.format(key, config))
+            self.logger.warning('[MULTIPLE-NODE]type of node is list: %s%s', key, config)
             return ''
 
         elems = self._get_node_elems(key, config, node)
         if not elems:
-            zlog.debug('[NON-ELEMS]: {}/{} find nothing'.format(key, config))
+            if self._debug:
+                self.logger.debug('[NON-ELEMS]: %s/%s find nothing', key, config)
             return ''
 
         if not isinstance(elems, list):
@@ -517,6 +1357,56 @@ class IParser(object):
 
         return [self._get_elem_attrs(elem, key, config) for elem in elems]
 
+    def _run_leaf(self, plan, node=None):
+        node = node or self.soup
+
+        # in case got node list
+        if isinstance(node, list):
+            self.logger.warning('[MULTIPLE-NODE]type of node is list: %s%s', plan.key, plan.config)
+            return ''
+
+        if self.profiler is None:
+            elems = self._select_node_elems(plan, node)
+        else:
+            elems = self.profiler.select(self, plan, node)
+        if not elems:
+            if self._debug:
+                self.logger.debug('[NON-ELEMS]: %s/%s find nothing', plan.key, plan.config)
+            return ''
+
+        if self.profiler is None:
+            return self._get_plan_elems_attrs(elems, plan)
+        return self.profiler.text(self, plan, elems)
+
+    def _get_plan_elems_attrs(self, elems, plan):
+        if plan.refine_many is not None:
+            return self._refine_many_elems_attrs(elems, plan)
+
+        if not isinstance(elems, list):
+            return self._get_plan_elem_attrs(elems, plan)
+
+        return [self._get_plan_elem_attrs(elem, plan) for elem in elems]
+
+    def _refine_many_elems_attrs(self, elems, plan):
+        """ raw values of all elems, refined at once by `plan.refine_many` """
+        many = isinstance(elems, list)
+        elems = elems if many else [elems]
+        values = [self._get_plan_elem_attrs(elem, plan) for elem in elems]
+        # only values which would be refined one by one are passed
+        index = [i for i, elem in enumerate(elems) if self._is_refinable(elem, plan)]
+        if index:
+            refined = plan.refine_many(self, [values[i] for i in index])
+            if len(refined) != len(index):
+                raise IParserException(
+                    '{}: batch refine returned {} values of {}'.format(plan.path, len(refined), len(index))
+                )
+            for i, value in zip(index, refined):
+                values[i] = value
+        return values if many else values[0]
+
+    def _is_refinable(self, elem, plan):
+        return bool(elem) and isinstance(elem, self._engine.node_types) and not plan.text_only
+
     def _get_elem_attrs(self, elem, key, config):
         """get elem's attributes
 
@@ -545,103 +1435,85 @@ class IParser(object):
               ...
         ```
         """
+        plan, raw_plan = self._legacy_node(key, config)
+        raw = self._get_plan_elem_attrs(elem, raw_plan)
+        # ga1/ga2, non-elem and elem not bs4.Tag are never refined
+        if not self._is_refinable(elem, plan):
+            return raw
+        return self.__refine_attr__(key, config, plan.attrs, raw)
+
+    def __refine_attr__(self, key, config, _attrs, raw):
+        """
+        ga4. refine attribute by `_attr_refine`/`_refine` of config
+
+        Args:
+            key (str):
+            config (dict):
+            _attrs (str/list/None): `_attr` of config
+            raw (str/dict): attribute or text of elem
+        """
+        plan = self._legacy_node(key, config)[0]
+        if plan.refine is not None:
+            return plan.refine(self, raw)
+        if plan.refine_many is not None:
+            return plan.refine_many(self, [raw])[0]
+        return raw
+
+    def _get_plan_elem_attrs(self, elem, plan):
         # 1.1 non-elem
         if not elem:
             return ''
         # 1.2 elem not bs4.Tag
-        if not isinstance(elem, bs4.Tag):
+        if not isinstance(elem, self._engine.node_types):
             return elem
 
         # ga1. config is None, just return
-        if config is None:
-            return elem.text
-
         # ga2. config is simple str selector, just return
-        if isinstance(config, str):
-            return elem.text
+        if plan.text_only:
+            return self._elem_text(elem)
 
         # ga3. config is dict
-        _attrs = config.get(RsvWords.attr)
-        _joiner = config.get(RsvWords.joiner, '')
-        _striped = config.get(RsvWords.striped, False)
-
         # ga3.1 parse attr/joiner/text
-        # TODO: add examples from here
-        if _attrs:
+        if plan.attrs:
             # ga3.1 _attr is the prime one
-            raw = self._get_prime_attr(elem, _attrs)
-        elif _joiner:
+            raw = self._get_prime_attr(elem, plan.attrs)
+        elif plan.joiner:
             # ga3.2 parse _joiner
-            raw = elem.get_text(_joiner, strip=_striped) or ''
+            if self._memo is None:
+                raw = self._engine.get_text(elem, plan.joiner, plan.striped) or ''
+            else:
+                raw = self._memo.get_text(self._engine, elem, plan.joiner, plan.striped) or ''
         else:
             # ga3.3 parse text
-            raw = self.get_striped_text(elem, _striped)
+            raw = self.get_striped_text(elem, plan.striped)
 
         # ga4. refine attribute
-        return self.__refine_attr__(key, config, _attrs, raw)
+        if plan.refine is None:
+            return raw
+        return plan.refine(self, raw)
 
     def _get_prime_attr(self, elem, attr):
         # ga3.1.1 attr is list
+        get_attr = self._engine.get_attr
         if isinstance(attr, list):
-            return {_attr: elem.get(_attr, '') for _attr in attr}
+            return {_attr: get_attr(elem, _attr, '') for _attr in attr}
 
         # ga3.1.2 attr is str
-        return elem.get(attr)
+        return get_attr(elem, attr)
+
+    def _elem_text(self, elem):
+        if self._memo is None:
+            return self._engine.text(elem)
+        return self._memo.text(self._engine, elem)
 
     def get_striped_text(self, elem, _striped=False, keep_original=False):
-        raw = elem if keep_original else elem.text
+        raw = elem if keep_original else self._elem_text(elem)
 
         if _striped is True:
             return raw.strip()
         if isinstance(_striped, str):
-            for x in _striped:
-                raw = raw.replace(x, '')
-            return raw
-
-        return raw
-
-    def __refine_attr__(self, key, config, _attrs, raw):
-        """
-        ga4.1 non refine
-        ga4.2 if attr_refine is str, just use it
-        ga4.3 else auto parse it
-
-        when _attr is `ga3.1.1`
-        image_1:
-            _attr:
-              - src
-              - alt
-            _attr_refine: true
-            _locator: span>a>img
-
-        image_2:
-            _locator: span>a>img
-            src:
-              _attr: src
-              _attr_refine: _refine_image_1_src
-            alt:
-              _attr: alt
-        """
-        # ga4.1 non-refine
-        _attr_refine = config.get(RsvWords.attr_refine)
-        if not _attr_refine:
-            return raw
+            return raw.translate(_delete_table(_striped))
 
-        # ga4.2 raw is dict, means _attr is `ga3.1.1`
-        if isinstance(raw, dict):
-            if _attr_refine is True:
-                _attr_refine = '{}_{}'.format(RsvWords.prefix_refine, key)
-            return {k: getattr(self, '{}_{}'.format(_attr_refine, k))(v) for k, v in raw.items()}
-
-        # ga4.3 raw is normal str
-        if _attr_refine is True:
-            _fmt = '{}_{}'
-            if isinstance(_attrs, str):
-                _fmt = '{}_{}_{}'
-            _attr_refine = _fmt.format(RsvWords.prefix_refine, key, _attrs)
-            # only keep characters allowed by python function names
-            _attr_refine = self.keep_allowed_chars(_attr_refine, replace_with='')
-        raw = getattr(self, _attr_refine)(raw)
         return raw
 
     """ staticmethod """
@@ -670,9 +1542,7 @@ class IParser(object):
 
     @staticmethod
     def keep_allowed_chars(src, custom='_', replace_with=''):
-        chars_allowed = string.ascii_letters + string.digits + custom
-        dst = ''.join([x if x in chars_allowed else replace_with for x in src])
-        return dst
+        return src.translate(_keep_table(string.ascii_letters + string.digits + custom, replace_with))
 
     @staticmethod
     def char_to_num(src, chars_allowed='0123456789', custom=''):
@@ -686,26 +1556,29 @@ class IParser(object):
         Returns:
             all chars in chars_allowed
         """
-        if custom:
-            chars_allowed += custom
-        n = ''.join(list([c for c in src if c in chars_allowed]))
-        return n
+        return src.translate(_keep_table(chars_allowed + custom))
 
     """ all following methods are used for enrich parsed results """
 
+    def _site_url(self):
+        return self.mapper['__raw']['site_url']
+
     def enrich_url(self, info, domain=''):
-        if urlparse(info).scheme:
-            return info
-        domain = domain or self.mapper['__raw']['site_url']
-        return urljoin(domain, info)
+        # absolute url needs no `__raw.site_url`
+        return _join_url(domain or self._site_url, info)
+
+    def enrich_url_many(self, infos, domain=''):
+        """ `enrich_url` of each item, e.g. `_attr_refine` of links selected with `_index: ~` """
+        domain = domain or self._site_url
+        return [_join_url(domain, x) for x in infos]
 
     def enrich_dot_k(self, info, custom='.'):
-        k = 'k'
-        unit = 1000 if k in info else 1
-        info = self.char_to_num(info.lower(), custom=custom)
-        if not info:
-            return 0
-        return float(info) * unit
+        return _dot_k(info, _keep_table(_DIGITS + custom))
+
+    def enrich_dot_k_many(self, infos, custom='.'):
+        """ `enrich_dot_k` of each item """
+        table = _keep_table(_DIGITS + custom)
+        return [_dot_k(x, table) for x in infos]
 
     def enrich_k(self, info):
         return self.enrich_dot_k(info, custom='')
@@ -717,6 +1590,104 @@ class IParser(object):
         return int(self.enrich_dot_k(info, custom=''))
 
 
+@functools.lru_cache(maxsize=4096)
+def _cascade_steps(locator, cascade_sep):
+    """
+    split locator into (head, tail) pairs once, instead of splitting and joining it for every record
+
+    e.g.: `a.b.c` => (('a', 'b.c'), ('b', 'c'), ('c', ''))
+    """
+    cascade_keys = locator.split(cascade_sep)
+    return tuple(
+        (cascade_keys[i], cascade_sep.join(cascade_keys[i + 1 :])) for i in range(len(cascade_keys))
+    )
+
+
+_DIGITS = '0123456789'
+
+
+@functools.lru_cache(maxsize=256)
+def _delete_table(chars):
+    """ `str.translate` table removing all `chars` """
+    return str.maketrans('', '', chars)
+
+
+class _KeepTable(dict):
+    """ `str.translate` table keeping allowed chars, others are replaced, looked up chars are remembered """
+
+    def __init__(self, allowed, replace_with=''):
+        super().__init__((ord(x), ord(x)) for x in allowed)
+        self.replace_with = replace_with or None
+
+    def __missing__(self, key):
+        self[key] = self.replace_with
+        return self.replace_with
+
+
+@functools.lru_cache(maxsize=256)
+def _keep_table(allowed, replace_with=''):
+    return _KeepTable(allowed, replace_with)
+
+
+def _dot_k(info, table):
+    # e.g.: `1.5k` => 1500.0, `k` is checked before lower() as it always was
+    unit = 1000 if 'k' in info else 1
+    info = info.lower().translate(table)
+    if not info:
+        return 0
+    return float(info) * unit
+
+
+@functools.lru_cache(maxsize=256)
+def _url_origin(domain):
+    """ `scheme://netloc` of a http(s) domain, None if urls should always be joined by urljoin """
+    parts = urlsplit(domain)
+    if parts.scheme in ('http', 'https') and parts.netloc:
+        return '{}://{}'.format(parts.scheme, parts.netloc)
+
+
+def _join_url(domain, info):
+    """
+    same as `urljoin(domain, info)` for relative info, domain is split once and cached
+
+    Args:
+        domain (str/callable): base url, or callable returning it, only called if info is relative
+    """
+    # a plain absolute path is appended to origin, urljoin would return the same
+    if (
+        info[:1] == '/'
+        and info[1:2] != '/'
+        and '/.' not in info
+        and '?' not in info
+        and '#' not in info
+        and ';' not in info
+        and info.isprintable()
+    ):
+        domain = domain() if callable(domain) else domain
+        origin = _url_origin(domain)
+        return origin + info if origin else urljoin(domain, info)
+    if urlparse(info).scheme:
+        return info
+    return urljoin(domain() if callable(domain) else domain, info)
+
+
+def _json_size(obj, seen):
+    """ bytes of decoded json objects, objects in `seen` are skipped, and visited ones are added to it """
+    size, stack = 0, [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, list):
+            stack.extend(obj)
+    return size
+
+
 class IJsonParser(IParser):
     def __init__(self, file_name='', *args, **kwargs):
         kwargs['elems_default_index'] = kwargs.get('elems_default_index', None)
@@ -727,11 +1698,17 @@ class IJsonParser(IParser):
         """ a valid json should be a dict or list """
         if raw_data:
             self.raw_data = raw_data
-        if not self.raw_data:
-            with open(self.file_name, 'rb') as fp:
-                self.raw_data = fp.read()
 
-        self.soup = json.loads(self.raw_data)
+        with self._open_document() as document:
+            if hasattr(document, 'read'):
+                self.soup = json.load(document)
+            elif isinstance(document, memoryview):
+                self.soup = json.loads(document.tobytes())
+            else:
+                self.soup = json.loads(document)
+        if not self.keep_raw_data:
+            self.raw_data = ''
+
         # T1: dict
         if isinstance(self.soup, dict):
             return
@@ -741,6 +1718,53 @@ class IJsonParser(IParser):
         # T2: list
         self.soup = [x for x in self.soup if x]
 
+    def _release_soup(self, soup):
+        # values of parsed data may be objects of the decoded json, which are still alive
+        seen = set()
+        _json_size(self._data, seen)
+        return _json_size(soup, seen)
+
+    def iter_parse(self, raw_or_path=None, chunk_size=CHUNK_SIZE, raw=None):
+        """
+        stream a large json whose top level is a list, the mapper is applied to each element
+        so only one element is kept in memory, instead of the whole decoded list
+
+        e.g.:
+            parser = ListDemoParser('')
+            for dat in parser.iter_parse(Path('jobs.json')):
+                dat['jobs']  # is the dict of one job
+
+        Args:
+            raw_or_path (file/Path/str/bytes): file object, str or path-like object is opened, bytes are json content,
+                `self.file_name` is opened if None
+            chunk_size (int): size of each read
+            raw (str/bytes): json content
+
+        Yields:
+            dict: parsed data of each element
+        """
+        if raw is not None:
+            raw_or_path = io.StringIO(raw) if isinstance(raw, str) else io.BytesIO(raw)
+        elif raw_or_path is None:
+            raw_or_path = self.file_name
+
+        if hasattr(raw_or_path, 'read'):
+            fp = contextlib.nullcontext(raw_or_path)
+        elif isinstance(raw_or_path, (str, os.PathLike)):
+            fp = open(raw_or_path, 'rb')
+        else:
+            fp = io.BytesIO(raw_or_path)
+
+        with fp as _fp:
+            for elem in iter_json_array(_fp, chunk_size):
+                # T2: falsy elements are dropped, as `init_soup` does
+                if not elem:
+                    continue
+                self.soup = elem
+                self._data = {}
+                self.do_parse()
+                yield self._data
+
     def select_soup_node_elems(self, root, locator, multiple=False):
         """
         in case some file's keys goes with `self.cascade_sep`, so we need go through the whole locator
@@ -773,10 +1797,8 @@ class IJsonParser(IParser):
             return root.get(locator, '')
 
         # e.g.: `features./job_category.values`
-        cascade_keys = locator.split(self.cascade_sep)
         elem_container = root
-        for i in range(len(cascade_keys)):
-            head, tail = cascade_keys[i], self.cascade_sep.join(cascade_keys[i + 1 :])
+        for head, tail in _cascade_steps(locator, self.cascade_sep):
             elem_container = elem_container.get(head, {})
             if not isinstance(elem_container, dict):
                 return ''
@@ -784,32 +1806,43 @@ class IJsonParser(IParser):
             if elem:
                 return elem
 
-    def _get_elem_attrs(self, elem, key, config):
+    @classmethod
+    def _compile_refine(cls, key, config):
+        _attr_refine = config.get(RsvWords.attr_refine)
+        if not _attr_refine:
+            return None
+
+        if _attr_refine is True:
+            _attr_refine = cls._auto_refine_name(key, config)
+
+        return bind_method(cls, _attr_refine)
+
+    @classmethod
+    def _auto_refine_name(cls, key, config, prefix=RsvWords.prefix_refine):
+        # `_attr` is not a part of the name for json
+        # only keep characters allowed by python function names
+        return cls.keep_allowed_chars('{}_{}'.format(prefix, key), replace_with='')
+
+    def _is_refinable(self, elem, plan):
+        return bool(elem) and not plan.text_only
+
+    def _get_prime_attr(self, elem, attr):
+        if isinstance(attr, list):
+            return {_attr: elem.get(_attr, '') for _attr in attr}
+        return elem.get(attr)
+
+    def _get_plan_elem_attrs(self, elem, plan):
         if not elem:
             return ''
 
-        if not isinstance(config, dict):
+        if plan.text_only:
             return elem
 
-        _attrs = config.get(RsvWords.attr)
-        _striped = config.get(RsvWords.striped, False)
-
-        if _attrs:
-            raw = self._get_prime_attr(elem, _attrs)
+        if plan.attrs:
+            raw = self._get_prime_attr(elem, plan.attrs)
         else:
-            raw = self.get_striped_text(elem, _striped, keep_original=True)
-
-        return self.__refine_attr__(key, config, '', raw)
+            raw = self.get_striped_text(elem, plan.striped, keep_original=True)
 
-    def __refine_attr__(self, key, config, _attrs, raw):
-        _attr_refine = config.get(RsvWords.attr_refine)
-        if not _attr_refine:
+        if plan.refine is None:
             return raw
-
-        if _attr_refine is True:
-            _fmt = '{}_{}'
-            _attr_refine = _fmt.format(RsvWords.prefix_refine, key)
-            # only keep characters allowed by python function names
-            _attr_refine = self.keep_allowed_chars(_attr_refine, replace_with='')
-
-        return getattr(self, _attr_refine)(raw)
+        return plan.refine(self, raw)
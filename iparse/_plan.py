@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+compiled execution plan of a yaml mapper
+
+the mapper is walked only once per parser class, every key is turned into an immutable `PlanNode`
+with its children, locator, index filter, attr settings and the resolved extract/refine methods
+'''
+
+import dataclasses
+import inspect
+import typing
+
+__all__ = [
+    'ParsePlan',
+    'PlanNode',
+]
+
+# how a node selects its elems, see `IParser.get_node_elems` gn1 ~ gn5
+SELECT_CURRENT = 0
+SELECT_FIRST = 1
+SELECT_ALL = 2
+SELECT_TYPO = 3
+SELECT_EMPTY = 4
+SELECT_INVALID = 5
+
+# `_index` not configured, use parser's `elems_default_index`
+DEFAULT_INDEX = object()
+
+
+class InvalidIndex(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class PlanNode:
+    """ one compiled mapper key """
+
+    key: str
+    config: typing.Any
+    # dotted key path from the mapper root, e.g. `top_container.top_left.menu_url`
+    path: str
+    children: tuple = ()
+    select: int = SELECT_CURRENT
+    locator: typing.Any = None
+    # callable(parser, elems) or None
+    extract: typing.Any = None
+    # callable(elems), None (keep all) or DEFAULT_INDEX
+    index: typing.Any = DEFAULT_INDEX
+    # config is None or str, only elem's text is wanted
+    text_only: bool = True
+    attrs: typing.Any = None
+    joiner: str = ''
+    striped: typing.Any = False
+    # callable(parser, raw) or None
+    refine: typing.Any = None
+    # callable(parser, raws) => refined list or None, refine of all values of the key at once
+    refine_many: typing.Any = None
+    # top level node of a parser class overriding config based hooks, run by `IParser._parse_dom` instead
+    legacy: bool = False
+
+    @property
+    def fields(self):
+        """ keys of children, in mapper order """
+        return tuple(x.key for x in self.children)
+
+    def __repr__(self):
+        return '<PlanNode {}>'.format(self.path)
+
+
+@dataclasses.dataclass(frozen=True)
+class ParsePlan:
+    """ all top level nodes of a mapper, in mapper order """
+
+    nodes: tuple = ()
+
+    def __repr__(self):
+        return '<ParsePlan {}>'.format([x.key for x in self.nodes])
+
+
+def index_filter(index):
+    """
+    compile `_index` into a filter of elems
+
+    Returns:
+        None if all elems are wanted, else callable(elems)
+    """
+    # gn5.1 `index: ~`
+    if index is None:
+        return None
+
+    # gn5.2 `index: <int>`
+    if isinstance(index, int):
+        return lambda elems: elems[min(index, len(elems) - 1)]
+
+    # gn5.3 `index: <list>`
+    if isinstance(index, list) and index:
+        _slice = slice(index[0], None) if len(index) == 1 else slice(index[0], index[-1])
+        return lambda elems: elems[_slice]
+
+    # gn5.4 `index: non-previous value`
+    def _invalid_index(elems):
+        raise InvalidIndex('error type of index({})'.format(index))
+
+    return _invalid_index
+
+
+def bind_method(cls, name):
+    """
+    resolve method `name` of parser class once, so it can be called as `func(parser, *args)`
+    without building the name and `getattr` on every call
+
+    if the method can not be found on class, it will be looked up on the instance when called,
+    which raises the same AttributeError as before if it is still missing
+    """
+    try:
+        attr = inspect.getattr_static(cls, name)
+    except (AttributeError, TypeError):
+        attr = None
+
+    if inspect.isfunction(attr):
+        return attr
+    if isinstance(attr, staticmethod):
+        func = attr.__func__
+        return lambda parser, *args, **kwargs: func(*args, **kwargs)
+    if isinstance(attr, classmethod):
+        func = attr.__func__
+        return lambda parser, *args, **kwargs: func(cls, *args, **kwargs)
+
+    return lambda parser, *args, **kwargs: getattr(parser, name)(*args, **kwargs)
+
+
+def iter_nodes(nodes):
+    """ all nodes of the plan, depth first """
+    for node in nodes:
+        yield node
+        yield from iter_nodes(node.children)
+
+
+def prune_plan(plan, paths):
+    """
+    keep only nodes on the way to `paths`, with the whole sub tree of each path
+
+    e.g.: `top_container.top_left` keeps `top_container` with its only child `top_left`
+
+    Args:
+        plan (ParsePlan):
+        paths (list): dotted key paths
+
+    Returns:
+        (pruned ParsePlan, list of paths not found in plan)
+    """
+    paths = set(paths)
+    invalid = sorted(paths - {x.path for x in iter_nodes(plan.nodes)})
+
+    def _prune(node):
+        if node.path in paths:
+            return node
+        prefix = node.path + '.'
+        if not any(x.startswith(prefix) for x in paths):
+            return None
+        children = tuple(x for x in map(_prune, node.children) if x is not None)
+        return dataclasses.replace(node, children=children) if children else None
+
+    nodes = tuple(x for x in map(_prune, plan.nodes) if x is not None)
+    return dataclasses.replace(plan, nodes=nodes), invalid
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+parse documents across a pool of warm worker processes, or a pool of threads
+'''
+
+import collections
+import concurrent.futures
+import copy
+import itertools
+import os
+from pathlib import Path
+import sys
+import threading
+
+from iparse._profile import FieldProfiler
+
+__all__ = [
+    'parse_concurrently',
+    'parse_files',
+]
+
+# parser of current worker process, created by `_init_worker`
+_WORKER_PARSER = None
+
+
+def current_rss():
+    """
+    resident set size of current process in bytes
+
+    read from `/proc` on linux, by `psutil` if installed elsewhere (e.g. macOS),
+    else it is the peak rss of `getrusage`, which never goes down
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    import resource
+
+    # peak rss, bytes on macOS, KB on linux and others
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _init_worker(parser_cls, parser_kwargs):
+    """ load and compile mapper only once per worker """
+    global _WORKER_PARSER
+    _WORKER_PARSER = parser_cls(file_name='', **parser_kwargs)
+    _WORKER_PARSER.plan
+
+
+def _parse_chunk(chunk):
+    # tree of each document is freed once parsed, so rss checked below is of results only
+    results = [(i, path, _WORKER_PARSER.parse(Path(path), release=True)) for i, path in chunk]
+    return results, current_rss()
+
+
+def _chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_files(
+    parser_cls, paths, workers=None, chunksize=1, ordered=True, max_tasks_per_worker=None, max_rss=None, **kwargs
+):
+    """
+    parse files with a `ProcessPoolExecutor`, each worker builds its parser once in the initializer
+
+    workers are recycled (the pool is rebuilt) when:
+        - about `max_tasks_per_worker` documents are parsed by each worker
+        - rss of any worker exceeds `max_rss` bytes
+
+    Args:
+        parser_cls (type): subclass of IParser
+        paths (iterable): files to parse
+        workers (int): number of processes, default is cpu count
+        chunksize (int): documents sent to a worker at once
+        ordered (bool): yield in input order if True, else in completion order
+        max_tasks_per_worker (int/None): recycle workers after this number of documents
+        max_rss (int/None): recycle workers once rss of a worker exceeds this number of bytes
+        **kwargs: kwargs to build parser
+
+    Yields:
+        (path, data)
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(int(chunksize), 1)
+    chunks = _chunked(enumerate(paths), chunksize)
+    # documents allowed to be submitted before the pool is rebuilt
+    budget = max_tasks_per_worker * workers if max_tasks_per_worker else None
+
+    # finished results waiting for their turn, only used when ordered
+    finished = {}
+    next_index = 0
+    exhausted = False
+    while not exhausted:
+        submitted, recycle = 0, False
+        futures = set()
+        pool = concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(parser_cls, kwargs))
+        try:
+            while True:
+                # keep at most 2 chunks per worker in flight
+                while not recycle and len(futures) < workers * 2 and (budget is None or submitted < budget):
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                        break
+                    futures.add(pool.submit(_parse_chunk, chunk))
+                    submitted += len(chunk)
+
+                if not futures:
+                    break
+
+                done, futures = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    results, rss = future.result()
+                    if max_rss and rss > max_rss:
+                        recycle = True
+
+                    if not ordered:
+                        for _, path, data in results:
+                            yield path, data
+                        continue
+
+                    for i, path, data in results:
+                        finished[i] = (path, data)
+                    while next_index in finished:
+                        yield finished.pop(next_index)
+                        next_index += 1
+        finally:
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=True)
+
+
+def local_parser(local, parser, copies=None):
+    """
+    shallow copy of parser for current thread, created once per thread
+
+    profiler is not thread-safe, each copy of a profiling parser has its own, see `merge_profilers`
+
+    Args:
+        copies (list/None): new copies are appended to it
+    """
+    _parser = getattr(local, 'parser', None)
+    if _parser is None:
+        _parser = local.parser = copy.copy(parser)
+        if parser.profiler is not None:
+            _parser.profiler = FieldProfiler()
+        if copies is not None:
+            copies.append(_parser)
+    return _parser
+
+
+def merge_profilers(parser, copies):
+    """ merge profilers of thread copies into the profiler of `parser` """
+    if parser.profiler is None:
+        return
+    for _parser in copies:
+        parser.profiler.merge(_parser.profiler)
+
+
+def parse_concurrently(parser, docs, threads=None):
+    """
+    parse documents with a `ThreadPoolExecutor`, each thread parses with its own shallow copy of `parser`,
+    so mapper and compiled plan are shared, while soup and data are not,
+    if profiling, each copy has its own profiler, merged into `parser.profiler` when done
+
+    only worth it with a backend releasing the GIL, e.g. `engine='lxml'`, or if docs are read from slow storage
+
+    Args:
+        parser (IParser): a built parser, used as template and never parses itself
+        docs (iterable): anything accepted by `parser.parse`
+        threads (int): number of threads, default is cpu count
+
+    Yields:
+        data of each document, in input order
+    """
+    threads = threads or os.cpu_count() or 1
+    # compile plan once, before it is copied to threads
+    parser.selected_plan
+    local = threading.local()
+    copies = []
+
+    def _parse(doc):
+        return local_parser(local, parser, copies).parse(doc)
+
+    docs = iter(docs)
+    futures = collections.deque()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+            try:
+                # keep at most 2 docs per thread in flight
+                for doc in itertools.islice(docs, threads * 2):
+                    futures.append(pool.submit(_parse, doc))
+                while futures:
+                    data = futures.popleft().result()
+                    doc = next(docs, None)
+                    if doc is not None:
+                        futures.append(pool.submit(_parse, doc))
+                    yield data
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        # threads are done once the pool is shut down
+        merge_profilers(parser, copies)
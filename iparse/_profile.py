@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+opt-in profiler of mapper keys: wall time of select/extract/text/refine, calls and nodes of each key path
+'''
+
+import collections
+import dataclasses
+import time
+
+__all__ = [
+    'FieldProfiler',
+]
+
+FIELDS = ('calls', 'nodes', 'select', 'extract', 'text', 'refine', 'refine_calls')
+TIMES = ('select', 'extract', 'text', 'refine')
+
+
+def _new_stats():
+    return dict.fromkeys(FIELDS, 0)
+
+
+class FieldProfiler(object):
+    """
+    enabled with `profile=True`, or share one profiler among parsers with `profile=FieldProfiler()`
+
+        - select: `select_soup_node_elems` of the key, excluding extract
+        - extract: `_locator_extract` method
+        - text: text/attrs of elems, excluding refine
+        - refine: `_attr_refine` method, or its batch method
+        - calls: times the key is selected, nodes: elems found
+
+    not thread-safe, use one profiler per thread and `merge` their reports
+
+    e.g.:
+        xkcd = XkcdParser(profile=True)
+        for page in pages:
+            xkcd.parse(page)
+        print(xkcd.profiler.pretty(top=10))
+    """
+
+    def __init__(self):
+        self._stats = collections.defaultdict(_new_stats)
+        # {id(plan): (plan, plan with timed extract/refine)}
+        self._plans = {}
+
+    def wrap_plan(self, plan):
+        """ plan whose extract/refine callables are timed, cached """
+        cached = self._plans.get(id(plan))
+        if cached is None or cached[0] is not plan:
+            cached = self._plans[id(plan)] = (plan, dataclasses.replace(plan, nodes=self._wrap_nodes(plan.nodes)))
+        return cached[1]
+
+    def _wrap_nodes(self, nodes):
+        return tuple(
+            dataclasses.replace(
+                node,
+                children=self._wrap_nodes(node.children),
+                extract=self._timed(node.extract, self._stats[node.path], 'extract'),
+                refine=self._timed(node.refine, self._stats[node.path], 'refine', 'refine_calls'),
+                refine_many=self._timed(node.refine_many, self._stats[node.path], 'refine', 'refine_calls'),
+            )
+            for node in nodes
+        )
+
+    @staticmethod
+    def _timed(func, stats, field, calls=None):
+        if func is None:
+            return None
+
+        def _func(parser, *args):
+            start = time.perf_counter()
+            try:
+                return func(parser, *args)
+            finally:
+                stats[field] += time.perf_counter() - start
+                if calls:
+                    stats[calls] += 1
+
+        return _func
+
+    def select(self, parser, plan, node):
+        """ `parser._select_node_elems`, extract time is excluded """
+        stats = self._stats[plan.path]
+        extract = stats['extract']
+        start = time.perf_counter()
+        elems = parser._select_node_elems(plan, node)
+        stats['select'] += time.perf_counter() - start - (stats['extract'] - extract)
+        stats['calls'] += 1
+        stats['nodes'] += len(elems) if isinstance(elems, list) else int(bool(elems))
+        return elems
+
+    def text(self, parser, plan, elems):
+        """ `parser._get_plan_elems_attrs`, refine time is excluded """
+        stats = self._stats[plan.path]
+        refine = stats['refine']
+        start = time.perf_counter()
+        values = parser._get_plan_elems_attrs(elems, plan)
+        stats['text'] += time.perf_counter() - start - (stats['refine'] - refine)
+        return values
+
+    def report(self, sort_by='total'):
+        """
+        Returns:
+            dict: {key path: {calls, nodes, select, extract, text, refine, refine_calls, total}}, sorted by `sort_by` desc
+        """
+        report = {}
+        for path, stats in self._stats.items():
+            if not stats['calls'] and not stats['refine_calls']:
+                continue
+            report[path] = dict(stats, total=sum(stats[x] for x in TIMES))
+        return dict(sorted(report.items(), key=lambda x: x[1][sort_by], reverse=True))
+
+    def merge(self, other):
+        """
+        aggregate another profiler or its report, e.g. reports of a batch parsed in other processes
+
+        Args:
+            other (FieldProfiler/dict):
+        """
+        report = other.report() if isinstance(other, FieldProfiler) else other
+        for path, stats in report.items():
+            for field in FIELDS:
+                self._stats[path][field] += stats.get(field, 0)
+        return self
+
+    def reset(self):
+        # timed plans keep the stats of their keys, so they are zeroed in place
+        for stats in self._stats.values():
+            stats.update(_new_stats())
+
+    def pretty(self, top=None, sort_by='total'):
+        """ report as a text table, time in ms """
+        rows = list(self.report(sort_by).items())[:top]
+        width = max([len(x[0]) for x in rows] + [8])
+        header = ('key path', 'calls', 'nodes', 'total') + TIMES
+        lines = ['{:<{w}} {:>8} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(*header, w=width)]
+        for path, stats in rows:
+            times = [stats[x] * 1000 for x in ('total',) + TIMES]
+            lines.append(
+                '{:<{w}} {:>8} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+                    path, stats['calls'], stats['nodes'], *times, w=width
+                )
+            )
+        return '\n'.join(lines)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+compact outputs of list nodes (`_index: ~` containers), instead of one dict per item
+
+    - columns: one list per key, keys are shared by all items
+    - slots: items, and containers inside them, are instances of a `__slots__` class generated from keys of the node
+'''
+
+import collections.abc
+import functools
+import keyword
+
+__all__ = [
+    'Columns',
+    'MISSING',
+    'Record',
+    'plain_data',
+]
+
+
+class _Missing(object):
+    """ value of a key not found in an item, e.g. its nodes are not found """
+
+    def __repr__(self):
+        return 'MISSING'
+
+    def __reduce__(self):
+        # pickled by name, so it stays a singleton across processes
+        return 'MISSING'
+
+    def __bool__(self):
+        return False
+
+
+MISSING = _Missing()
+
+
+class Columns(collections.abc.Sequence):
+    """
+    items of a list node stored by column, `columns[i]` are values of `fields[i]` of all items
+
+    reads as a list of dicts, `column('key')` is the whole column, and `to_dicts()` converts it back,
+    missing keys of an item are `MISSING` in columns and left out of its dict, as the dict output does
+
+    e.g.:
+        jobs = parser.parse(raw)['jobs']
+        jobs.column('title')  # ['a', 'b', ...]
+        jobs[0]  # {'title': 'a', ...}
+    """
+
+    __slots__ = ('fields', 'columns')
+
+    def __init__(self, fields, columns=None):
+        self.fields = tuple(fields)
+        self.columns = columns if columns is not None else tuple([] for _ in self.fields)
+
+    def append(self, dat):
+        for field, column in zip(self.fields, self.columns):
+            column.append(dat.get(field, MISSING))
+
+    def column(self, field):
+        return self.columns[self.fields.index(field)]
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Columns(self.fields, tuple(x[index] for x in self.columns))
+        return {k: v for k, v in zip(self.fields, (x[index] for x in self.columns)) if v is not MISSING}
+
+    def __eq__(self, other):
+        if isinstance(other, Columns):
+            return self.fields == other.fields and self.columns == other.columns
+        return isinstance(other, collections.abc.Sequence) and list(self) == list(other)
+
+    def __repr__(self):
+        return '<Columns {} x {}>'.format(len(self), list(self.fields))
+
+    def __reduce__(self):
+        return Columns, (self.fields, self.columns)
+
+    def to_dicts(self):
+        return list(self)
+
+
+class Record(object):
+    """
+    base of `__slots__` records, a record reads as a read-only mapping of its keys,
+    `to_dict()` converts it back, keys never set (e.g. nodes not found) are left out, as the dict output does
+    """
+
+    __slots__ = ()
+    fields = ()
+
+    # parser fills a record as it fills a dict
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def setdefault(self, key, default=None):
+        value = getattr(self, key, MISSING)
+        if value is MISSING:
+            setattr(self, key, default)
+            return default
+        return value
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self.fields and hasattr(self, key)
+
+    def keys(self):
+        return [x for x in self.fields if hasattr(self, x)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def values(self):
+        return [getattr(self, x) for x in self.keys()]
+
+    def items(self):
+        return [(x, getattr(self, x)) for x in self.keys()]
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        return {x: getattr(self, x) for x in self.keys()}
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self.fields == other.fields and self.to_dict() == other.to_dict()
+        return isinstance(other, collections.abc.Mapping) and self.to_dict() == dict(other)
+
+    def __repr__(self):
+        return '<{} {}>'.format(self.__class__.__name__, self.to_dict())
+
+    def __reduce__(self):
+        # the class is generated again from fields in other processes
+        return _make_record, (self.fields, tuple(getattr(self, x, MISSING) for x in self.fields))
+
+
+@functools.lru_cache(maxsize=None)
+def record_class(fields):
+    """
+    `__slots__` class of keys, one class for same keys
+
+    Raises:
+        ValueError: a key is not a valid attribute name
+    """
+    for field in fields:
+        if not field.isidentifier() or keyword.iskeyword(field) or hasattr(Record, field):
+            raise ValueError('key ({}) can not be a record attribute, use records columns instead'.format(field))
+    return type('Record', (Record,), {'__slots__': fields, 'fields': fields})
+
+
+def _make_record(fields, values):
+    record = record_class(fields)()
+    for field, value in zip(fields, values):
+        if value is not MISSING:
+            setattr(record, field, value)
+    return record
+
+
+def plain_data(dat):
+    """ copy of data with columns/records converted into lists/dicts, e.g. before dumping to yaml """
+    if isinstance(dat, (Columns, list)):
+        return [plain_data(x) for x in dat]
+    if isinstance(dat, Record):
+        dat = dat.to_dict()
+    if isinstance(dat, dict):
+        return {k: plain_data(v) for k, v in dat.items()}
+    return dat
+
+
+def _json_default(obj):
+    """ `default` of json encoders, columns/records are dumped as lists/dicts """
+    if isinstance(obj, Columns):
+        return obj.to_dicts()
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError('Object of type {} is not JSON serializable'.format(obj.__class__.__name__))
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+built-in refine steps of yaml `_refine` pipelines, compiled once into one callable per key
+
+    title:
+      _locator: h1
+      _refine:
+        - collapse_ws
+        - {replace: [',', '']}
+        - {last_non_empty_info: {sep: ' ', index: 0}}
+        - to_int
+'''
+
+import functools
+import inspect
+
+from iparse._plan import bind_method
+
+__all__ = [
+    'REFINERS',
+    'register_refiner',
+]
+
+
+def _collapse_ws(value):
+    return ' '.join(value.split())
+
+
+def _number(convert, value):
+    if isinstance(value, str):
+        value = value.replace(',', '').strip()
+    return convert(value)
+
+
+def _remove_chars(chars):
+    table = str.maketrans('', '', chars)
+    return lambda value: value.translate(table)
+
+
+def _default(default):
+    return lambda value: value if value else default
+
+
+# name: func(value, *args) => value
+REFINERS = {
+    'strip': lambda value, chars=None: value.strip(chars),
+    'lstrip': lambda value, chars=None: value.lstrip(chars),
+    'rstrip': lambda value, chars=None: value.rstrip(chars),
+    'lower': str.lower,
+    'upper': str.upper,
+    'collapse_ws': _collapse_ws,
+    'replace': lambda value, old, new='': value.replace(old, new),
+    'split': lambda value, sep=None: value.split(sep),
+    'join': lambda value, sep='': sep.join(value),
+    'to_int': functools.partial(_number, int),
+    'to_float': functools.partial(_number, float),
+}
+
+# name: factory(*args) => func(value), arguments are compiled once, e.g. translate tables
+REFINER_FACTORIES = {
+    'remove_chars': _remove_chars,
+    'default': _default,
+}
+
+# methods of parser, looked up on parser class, so subclasses may override them
+PARSER_REFINERS = (
+    'char_to_num',
+    'enrich_dot_k',
+    'enrich_dot_k_int',
+    'enrich_k',
+    'enrich_k_int',
+    'enrich_url',
+    'keep_allowed_chars',
+    'last_non_empty_info',
+)
+
+
+def register_refiner(name, func=None):
+    """
+    add a step to the library, shared by all parsers, e.g. as decorator:
+
+        @register_refiner('to_cents')
+        def to_cents(value):
+            return int(float(value) * 100)
+    """
+    if func is None:
+        return lambda f: register_refiner(name, f)
+    REFINERS[name] = func
+    return func
+
+
+def _step_args(step):
+    """ `name`, `{name: arg}`, `{name: [args]}` or `{name: {kwargs}}` => (name, args, kwargs) """
+    if isinstance(step, str):
+        return step, (), {}
+    if not isinstance(step, dict) or len(step) != 1:
+        raise ValueError('refine step should be a name or a dict of one name, got ({})'.format(step))
+
+    name, args = next(iter(step.items()))
+    if args is None:
+        return name, (), {}
+    if isinstance(args, dict):
+        return name, (), args
+    if isinstance(args, list):
+        return name, tuple(args), {}
+    return name, (args,), {}
+
+
+def _compile_step(cls, step):
+    """
+    Returns:
+        (func, with_parser): func(parser, value) if with_parser else func(value)
+    """
+    name, args, kwargs = _step_args(step)
+    if name in REFINER_FACTORIES:
+        return REFINER_FACTORIES[name](*args, **kwargs), False
+    if name in REFINERS:
+        func = REFINERS[name]
+        # missing or unknown arguments raise TypeError here, instead of on parsing
+        inspect.signature(func).bind(None, *args, **kwargs)
+        if kwargs:
+            return lambda value: func(value, *args, **kwargs), False
+        if args:
+            return lambda value: func(value, *args), False
+        return func, False
+    if name in PARSER_REFINERS or (name.startswith('_') and hasattr(cls, name)):
+        method = bind_method(cls, name)
+        if args or kwargs:
+            return lambda parser, value: method(parser, value, *args, **kwargs), True
+        return method, True
+    raise ValueError('unknown refine step ({})'.format(name))
+
+
+def compile_pipeline(cls, steps):
+    """
+    compose steps into one callable(parser, raw)
+
+    steps are built-in refiners, `PARSER_REFINERS` or `_` prefixed methods of parser class
+
+    Raises:
+        ValueError: unknown step or invalid arguments
+    """
+    if isinstance(steps, (str, dict)):
+        steps = [steps]
+    compiled = tuple(_compile_step(cls, x) for x in steps)
+
+    if len(compiled) == 1:
+        func, with_parser = compiled[0]
+        return func if with_parser else lambda parser, value: func(value)
+
+    def _pipeline(parser, value):
+        for func, with_parser in compiled:
+            value = func(parser, value) if with_parser else func(value)
+        return value
+
+    return _pipeline
+
+
+def chain_refine(first, then):
+    """ refine by `first`, e.g. `_attr_refine` method, then by `then` """
+    if first is None or then is None:
+        return first or then
+    return lambda parser, value: then(parser, first(parser, value))
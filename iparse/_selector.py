@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+__description__ = '''
+compiled css selectors shared by all parsers
+'''
+
+import functools
+
+import soupsieve
+
+__all__ = [
+    'compile_selector',
+    'selector_cache_clear',
+    'selector_cache_info',
+]
+
+SELECTOR_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=SELECTOR_CACHE_SIZE)
+def _compile_selector(locator, namespaces):
+    return soupsieve.compile(locator, dict(namespaces) if namespaces else None)
+
+
+def compile_selector(locator, namespaces=None):
+    """
+    compile css selector once, and reuse it for every node and document
+
+    Args:
+        locator (str): css selector
+        namespaces (dict): namespaces of soup, bs4 keeps it as `tag._namespaces`
+
+    Returns:
+        soupsieve.SoupSieve
+    """
+    return _compile_selector(locator, tuple(namespaces.items()) if namespaces else ())
+
+
+def selector_cache_info():
+    """
+    Returns:
+        functools._CacheInfo: (hits, misses, maxsize, currsize) of compiled selectors
+    """
+    return _compile_selector.cache_info()
+
+
+def selector_cache_clear():
+    _compile_selector.cache_clear()
@@ -18,8 +18,11 @@ setup(
     long_description_content_type="text/markdown",
     license='GPL',
     install_requires=[
-        'logzero', 'PyYAML', 'stringcase', 'beautifulsoup4'
+        'logzero', 'PyYAML', 'stringcase', 'beautifulsoup4', 'soupsieve'
     ],
+    extras_require={
+        'lxml': ['lxml', 'cssselect'],
+    },
     project_urls={
         'Bug Reports': 'https://github.com/coghost/iparse/issues',
         'Source': 'https://github.com/coghost/iparse',
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+import yaml
+
+HOME_DIR = Path(__file__).parents[1]
+sys.path.append(str(HOME_DIR))
+
+from iparse import (
+    IParser,
+    clear_mapper_cache,
+    compile_selector,
+    selector_cache_clear,
+    selector_cache_info,
+    yaml_loader,
+)
+from tests.test_iparser import XkcdParser
+
+XKCD_HTML = HOME_DIR / 'tests/xkcd_python_353.htm'
+
+
+class TestMapperCache(unittest.TestCase):
+    def setUp(self):
+        clear_mapper_cache()
+
+    def test_01_mapper_shared_and_read_only(self):
+        a = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+        b = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+        self.assertIs(a.mapper, b.mapper)
+        with self.assertRaises(TypeError):
+            a.mapper['page'] = {}
+        with self.assertRaises(TypeError):
+            a.mapper['__raw'].pop('site_url')
+        self.assertEqual('https://xkcd.com/', b.mapper['__raw']['site_url'])
+
+    def test_02_test_keys_not_popped(self):
+        startup_dir = Path(tempfile.mkdtemp())
+        try:
+            (startup_dir / 'xkcd.yaml').write_text('__raw:\n  test_keys: [page]\npage:\n  title: head>title\n')
+            a = XkcdParser(file_name=XKCD_HTML, startup_dir=startup_dir)
+            b = XkcdParser(file_name=XKCD_HTML, startup_dir=startup_dir)
+            self.assertEqual(['page'], a.test_keys)
+            self.assertEqual(['page'], b.test_keys)
+        finally:
+            shutil.rmtree(startup_dir)
+
+    def test_03_invalidated_by_mtime(self):
+        startup_dir = Path(tempfile.mkdtemp())
+        site_yaml = startup_dir / 'xkcd.yaml'
+        try:
+            site_yaml.write_text('page:\n  title: head>title\n')
+            a = XkcdParser(file_name=XKCD_HTML, startup_dir=startup_dir, is_test_mode=True)
+            a.do_parse()
+            self.assertEqual({'page': {'title': 'xkcd: Python'}}, a.data)
+
+            site_yaml.write_text('page:\n  footnote_title: head>title\n')
+            st = site_yaml.stat()
+            os.utime(site_yaml, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+            b = XkcdParser(file_name=XKCD_HTML, startup_dir=startup_dir, is_test_mode=True)
+            b.do_parse()
+            self.assertIsNot(a.mapper, b.mapper)
+            self.assertEqual({'page': {'footnote_title': 'xkcd: Python'}}, b.data)
+        finally:
+            shutil.rmtree(startup_dir)
+
+    def test_04_dump_read_only(self):
+        xkcd = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+        self.assertEqual(xkcd.mapper, yaml_loader(IParser.shift(xkcd.mapper), raw_data=True))
+        self.assertEqual(xkcd.mapper, yaml_loader(yaml.dump(xkcd.mapper), raw_data=True))
+
+
+class TestSelectorCache(unittest.TestCase):
+    def setUp(self):
+        selector_cache_clear()
+
+    def test_01_compiled_once(self):
+        self.assertIs(compile_selector('div#topLeft>ul>li>a'), compile_selector('div#topLeft>ul>li>a'))
+        info = selector_cache_info()
+        self.assertEqual((1, 1), (info.hits, info.misses))
+
+    def test_02_reused_among_documents(self):
+        for _ in range(2):
+            xkcd = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+            xkcd.do_parse()
+        info = selector_cache_info()
+        self.assertGreater(info.hits, info.misses)
+        self.assertEqual(info.misses, info.currsize)
+
+
+if __name__ == '__main__':
+    unittest.main()
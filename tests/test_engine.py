@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+import unittest
+
+HOME_DIR = Path(__file__).parents[1]
+sys.path.append(str(HOME_DIR))
+
+from iparse import compare_engines
+from iparse._engine import sniff_encoding
+from iparse._parse import _SITE_ENCODINGS
+from tests.test_iparser import XkcdParser
+from tests.test_linkedin import LinkedinParser
+
+# html fixtures with parser and site yaml
+FIXTURES = [
+    (LinkedinParser, 'linkedin.html', 'linkedin'),
+    (XkcdParser, 'xkcd_python_353.htm', 'xkcd'),
+    (XkcdParser, 'xkcd_python_353.htm', 'xkcd_demo'),
+    (XkcdParser, 'xkcd_python_353.htm', 'xkcd01'),
+]
+
+
+class TestEngines(unittest.TestCase):
+    def test_01_all_fixtures_same_as_bs4(self):
+        for parser_cls, file_name, startup_yaml in FIXTURES:
+            with self.subTest(startup_yaml=startup_yaml):
+                diffs = compare_engines(
+                    parser_cls, HOME_DIR / 'tests' / file_name, startup_yaml=startup_yaml, is_test_mode=True
+                )
+                self.assertEqual([], diffs)
+
+    def test_02_lxml_engine(self):
+        xkcd = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', engine='lxml', is_test_mode=True)
+        xkcd.do_parse()
+        self.assertEqual('xkcd: Python', xkcd.data['page']['title'])
+        nav = xkcd.data['middle_container']['comic_nav']['nav']
+        self.assertEqual({'href': 'https://xkcd.com/352/', 'text': '< Prev', 'rel': ['prev'], 'accesskey': ['p']}, nav[1])
+
+
+    def test_03_lxml_same_as_bs4(self):
+        raw = (
+            '<?xml version="1.0" encoding="utf-8"?><html><head><title>café</title></head><body>'
+            '<div id="x"><ul><li>a</li><li class="b">b</li></ul><h2>h</h2><p>c</p><p>d</p></div>'
+            '</body></html>'
+        )
+        mapper = {
+            'page': {'title': 'head>title'},
+            # the rest of child locators match outside their parent node, as soupsieve does
+            'p': {
+                '_locator': 'ul',
+                'li': {'_locator': 'div#x li', '_index': None},
+                'child': {'_locator': 'div > ul > li.b'},
+            },
+            'r': {
+                '_locator': 'div#x',
+                'first': {'_locator': 'div#x > ul > li'},
+                'adjacent': {'_locator': 'h2 + p', '_index': None},
+                'sibling': {'_locator': 'h2 ~ p', '_index': None},
+            },
+        }
+        expected = {
+            'page': {'title': 'café'},
+            'p': {'li': ['a', 'b'], 'child': 'b'},
+            'r': {'first': 'a', 'adjacent': ['c'], 'sibling': ['c', 'd']},
+        }
+        for engine in ('bs4', 'lxml'):
+            xkcd = XkcdParser(file_name='', startup_yaml_config=mapper, engine=engine, is_test_mode=True)
+            self.assertEqual(expected, xkcd.parse(raw=raw), engine)
+            self.assertEqual(expected, xkcd.parse(raw.encode('utf-8')), engine)
+
+
+class TestStrainer(unittest.TestCase):
+    def test_01_strained_same_as_full(self):
+        keys = ['recommendations', 'experience']
+        full = LinkedinParser(file_name=HOME_DIR / 'tests/linkedin.html', selected_keys=keys, is_test_mode=True)
+        full.do_parse()
+        strained = LinkedinParser(
+            file_name=HOME_DIR / 'tests/linkedin.html', selected_keys=keys, strain=True, is_test_mode=True
+        )
+        strained.do_parse()
+        self.assertEqual(full.data, strained.data)
+        self.assertLess(len(strained.soup.find_all()), len(full.soup.find_all()) / 5)
+
+    def test_02_fall_back_to_full_tree(self):
+        # `page` has no _locator, it needs the whole document
+        xkcd = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', strain=True, is_test_mode=True)
+        self.assertIsNone(xkcd._strainer())
+        xkcd.do_parse()
+        self.assertEqual('xkcd: Python', xkcd.data['page']['title'])
+
+        # `section.education>ul>li` can not be a strainer
+        lkn = LinkedinParser(
+            file_name=HOME_DIR / 'tests/linkedin.html', selected_keys=['education'], strain=True, is_test_mode=True
+        )
+        self.assertIsNone(lkn._strainer())
+
+
+class TestEncoding(unittest.TestCase):
+    def test_01_sniff_encoding(self):
+        self.assertEqual('utf-8', sniff_encoding(b'<head><meta charset="UTF-8"></head>'))
+        self.assertEqual(
+            'gb2312', sniff_encoding(b'<META http-equiv="Content-Type" content="text/html; charset=gb2312" />')
+        )
+        self.assertEqual('utf-8', sniff_encoding(b'\xef\xbb\xbf<html>'))
+        self.assertEqual('utf-16-le', sniff_encoding(b'\xff\xfe<\x00'))
+        self.assertIsNone(sniff_encoding(b'<html><p>no charset</p>'))
+        self.assertIsNone(sniff_encoding(b'<meta charset="unknown-charset">'))
+
+    def test_02_site_encoding(self):
+        _SITE_ENCODINGS.clear()
+        xkcd = XkcdParser(file_name='', features='html.parser')
+        xkcd.parse((HOME_DIR / 'tests/xkcd_python_353.htm').read_bytes())
+        self.assertEqual('utf-8', _SITE_ENCODINGS['xkcd'])
+
+        # no charset declared, remembered utf-8 is used
+        undeclared = '<html><body><p>café</p></body></html>'
+        xkcd.parse(undeclared.encode('utf-8'))
+        self.assertEqual('utf-8', xkcd.soup.original_encoding)
+        self.assertEqual('café', xkcd.soup.p.text)
+
+        # utf-8 fails, fall back to full detection, and remember the new one
+        xkcd.parse(undeclared.encode('cp1252'))
+        self.assertEqual('café', xkcd.soup.p.text)
+        self.assertEqual('windows-1252', _SITE_ENCODINGS['xkcd'])
+
+
+if __name__ == '__main__':
+    unittest.main()
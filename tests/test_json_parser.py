@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import io
+import json
 import os
 import sys
 from pathlib import Path
@@ -8,6 +10,7 @@ HOME_DIR = Path(__file__).parents[1]
 sys.path.append(str(HOME_DIR))
 
 from iparse import IJsonParser
+from iparse._json_stream import iter_json_array
 
 
 class ListDemoParser(IJsonParser):
@@ -222,6 +225,44 @@ class TestJsonParser(unittest.TestCase):
         jobs = expected['jobs']
         self.assertListEqual(jobs, ldp.data['jobs'])
 
+    def test_03_iter_parse_ldp(self):
+        ldp = ListDemoParser(file_name=HOME_DIR / 'tests/list_demo.json')
+        ldp.do_parse()
+
+        # small chunks, elements are split among many reads
+        ldp_stream = ListDemoParser(file_name=HOME_DIR / 'tests/list_demo.json')
+        jobs = [x['jobs'] for x in ldp_stream.iter_parse(chunk_size=128)]
+        self.assertListEqual(ldp.data['jobs'], jobs)
+
+        with open(HOME_DIR / 'tests/list_demo.json', 'rb') as fp:
+            self.assertEqual(len(ldp.data['jobs']), len(list(ldp_stream.iter_parse(fp))))
+
+    def test_04_iter_json_array(self):
+        expected = [0, 12345678901234567890, -2.5e3, '鞍山', {'a': [1, {'b': None}]}, [], {}, True, None, 'x' * 300]
+        raw = json.dumps(expected, ensure_ascii=False)
+        for chunk_size in (1, 3, 64, 4096):
+            self.assertListEqual(expected, list(iter_json_array(io.BytesIO(raw.encode('utf-8')), chunk_size)))
+            self.assertListEqual(expected, list(iter_json_array(io.StringIO(raw), chunk_size)))
+
+        for raw in ('{}', '[1, 2', '[1 2]', '[1, ]'):
+            with self.assertRaises(ValueError):
+                list(iter_json_array(io.StringIO(raw), 2))
+
+    def test_05_cascade_locator(self):
+        ddp = DictDemoParser(file_name=HOME_DIR / 'tests/dict_demo.json')
+        root = {
+            'a.b': 1,
+            'features': {'/job_category.values': 2, 'x': {'y': {'z': 3}}},
+            'c': {'d': 'str'},
+        }
+        for _ in range(2):
+            # second round runs with compiled cascade steps
+            self.assertEqual(1, ddp._select_json_sub_node(root, 'a.b'))
+            self.assertEqual(2, ddp._select_json_sub_node(root, 'features./job_category.values'))
+            self.assertEqual(3, ddp._select_json_sub_node(root, 'features.x.y.z'))
+            self.assertEqual('', ddp._select_json_sub_node(root, 'c.d.e'))
+            self.assertIsNone(ddp._select_json_sub_node(root, 'features.none'))
+
 
 if __name__ == '__main__':
     unittest.main()
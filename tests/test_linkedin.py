@@ -2,6 +2,7 @@
 import os
 import sys
 from pathlib import Path
+from urllib.parse import urljoin, urlparse
 import logzero
 import unittest
 
@@ -331,5 +332,39 @@ class TestLinkedinParser(unittest.TestCase):
             self.assertEqual(v, lkn.data[k])
 
 
+class TestEnrich(unittest.TestCase):
+    def test_01_text_helpers(self):
+        self.assertEqual('a_b1', IParser.keep_allowed_chars('a-_b 1!'))
+        self.assertEqual('a__b', IParser.keep_allowed_chars('a-=b', custom='', replace_with='_'))
+        self.assertEqual('12.5', IParser.char_to_num('$12.5k', custom='.'))
+        lkn = LinkedinParser(file_name='', is_test_mode=True)
+        self.assertEqual('ab', lkn.get_striped_text('"a:b"', '":', keep_original=True))
+
+    def test_02_many(self):
+        lkn = LinkedinParser(file_name='', is_test_mode=True)
+        site_url = lkn.mapper['__raw']['site_url']
+        links = ['/in/a', '//cdn.example.com/x.png', '/in/../b', '/in/c?x=1', 'd', 'https://example.com/', '']
+        expected = [x if urlparse(x).scheme else urljoin(site_url, x) for x in links]
+        self.assertEqual(expected, [lkn.enrich_url(x) for x in links])
+        self.assertEqual(expected, lkn.enrich_url_many(links))
+        self.assertEqual('https://in.linkedin.com/in/a', expected[0])
+        self.assertEqual('https://in.linkedin.com/b', expected[2])
+        domain = 'https://example.com/jobs/'
+        expected = [x if urlparse(x).scheme else urljoin(domain, x) for x in links]
+        self.assertEqual(expected, lkn.enrich_url_many(links, domain))
+
+        # absolute urls need no `__raw.site_url`
+        lkn = LinkedinParser(file_name='', startup_yaml_config={'name': 'h1'}, is_test_mode=True)
+        links = ['https://example.com/a', 'mailto:a@example.com']
+        self.assertEqual(links, [lkn.enrich_url(x) for x in links])
+        self.assertEqual(links, lkn.enrich_url_many(links))
+        with self.assertRaises(KeyError):
+            lkn.enrich_url('/in/a')
+
+        infos = ['500+ connections', '1.5k followers', 'k', '']
+        self.assertEqual([500.0, 1500.0, 0, 0], lkn.enrich_dot_k_many(infos))
+        self.assertEqual([lkn.enrich_dot_k(x) for x in infos], lkn.enrich_dot_k_many(infos))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import sys
+from pathlib import Path
+import tempfile
+import unittest
+
+HOME_DIR = Path(__file__).parents[1]
+sys.path.append(str(HOME_DIR))
+
+from iparse import NdjsonWriter
+from tests.test_iparser import XkcdParser
+from tests.test_json_parser import ListDemoParser
+
+XKCD_HTML = HOME_DIR / 'tests/xkcd_python_353.htm'
+
+
+class TestSerialization(unittest.TestCase):
+    def test_01_json_variants(self):
+        xkcd = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+        xkcd.do_parse()
+        for dumped in (xkcd.data_as_json, xkcd.data_as_compact_json, xkcd.data_as_sorted_json):
+            self.assertEqual(xkcd.data, json.loads(dumped))
+        self.assertNotIn('\n', xkcd.data_as_compact_json)
+        self.assertEqual(json.dumps(json.loads(xkcd.data_as_json), separators=(',', ':')), xkcd.data_as_sorted_json)
+
+
+class TestNdjsonWriter(unittest.TestCase):
+    def test_01_buffered_lines(self):
+        ldp = ListDemoParser(file_name='', is_test_mode=True)
+        raw = (HOME_DIR / 'tests/list_demo.json').read_text()
+        fp = io.StringIO()
+        writer = NdjsonWriter(fp, buffer_size=1 << 20)
+        writer.write(ldp.parse(raw=raw))
+        writer.write(ldp)
+        # nothing written before buffer is full or flushed
+        self.assertEqual('', fp.getvalue())
+        writer.flush()
+
+        lines = fp.getvalue().splitlines()
+        self.assertEqual(2, writer.count)
+        self.assertEqual([ldp.data, ldp.data], [json.loads(x) for x in lines])
+
+    def test_02_append_to_path(self):
+        xkcd = XkcdParser(file_name='', lazy=True, is_test_mode=True)
+        with tempfile.TemporaryDirectory() as workdir:
+            path = Path(workdir) / 'xkcd.ndjson'
+            for _ in range(2):
+                with NdjsonWriter(path, buffer_size=1) as writer:
+                    self.assertEqual(2, writer.write_many([xkcd.parse(XKCD_HTML), ('meta', xkcd.data)]))
+            lines = path.read_text(encoding='utf-8').splitlines()
+        self.assertEqual(4, len(lines))
+        self.assertEqual('xkcd: Python', json.loads(lines[-1])['page']['title'])
+
+
+if __name__ == '__main__':
+    unittest.main()
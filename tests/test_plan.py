@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+import logging
+import sys
+from pathlib import Path
+import unittest
+
+HOME_DIR = Path(__file__).parents[1]
+sys.path.append(str(HOME_DIR))
+
+from logzero import logger as zlog
+
+from iparse import REFINERS, IParserException, ParsePlan, PlanNode, register_refiner
+from tests.test_iparser import XkcdParser
+
+
+class TestParsePlan(unittest.TestCase):
+    def test_01_plan_shared_by_instances(self):
+        a = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', is_test_mode=True)
+        b = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', is_test_mode=True)
+        self.assertIsInstance(a.plan, ParsePlan)
+        self.assertIs(a.plan, b.plan)
+
+    def test_02_plan_nodes(self):
+        xkcd = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', is_test_mode=True)
+        keys = [x.key for x in xkcd.plan.nodes]
+        self.assertEqual(['page', 'top_container', 'middle_container', 'bottom'], keys)
+
+        top = xkcd.plan.nodes[1]
+        self.assertIsInstance(top, PlanNode)
+        self.assertEqual('div#topContainer', top.locator)
+        top_left = top.children[0]
+        self.assertEqual('top_container.top_left', top_left.path)
+        self.assertIsNone(top_left.index)
+        href = top_left.children[0]
+        self.assertEqual(('href', 'text'), tuple(x.key for x in top_left.children))
+        self.assertEqual('https://xkcd.com/archive', href.refine(xkcd, '/archive'))
+
+    def test_03_plan_with_yaml_config(self):
+        xkcd = XkcdParser(
+            file_name=HOME_DIR / 'tests/xkcd_python_353.htm',
+            is_test_mode=True,
+            startup_yaml_config={'page': {'title': 'head>title'}},
+        )
+        xkcd.do_parse()
+        self.assertEqual({'page': {'title': 'xkcd: Python'}}, xkcd.data)
+
+    def test_04_selected_paths(self):
+        full = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', is_test_mode=True)
+        full.do_parse()
+
+        xkcd = XkcdParser(
+            file_name=HOME_DIR / 'tests/xkcd_python_353.htm',
+            is_test_mode=True,
+            selected_paths=['top_container.top_left.href', 'page.title', 'bottom.comic'],
+        )
+        top = xkcd.selected_plan.nodes[1]
+        self.assertEqual(('top_left',), tuple(x.key for x in top.children))
+        self.assertEqual(('href',), tuple(x.key for x in top.children[0].children))
+        # sub tree of a selected path is kept as it is
+        comic = [x for x in full.plan.nodes[3].children if x.key == 'comic'][0]
+        self.assertIs(comic, xkcd.selected_plan.nodes[2].children[0])
+
+        xkcd.do_parse()
+        self.assertEqual(
+            {
+                'page': {'title': full.data['page']['title']},
+                'top_container': {'top_left': [{'href': x['href']} for x in full.data['top_container']['top_left']]},
+                'bottom': {'comic': full.data['bottom']['comic']},
+            },
+            xkcd.data,
+        )
+
+    def test_05_invalid_selected_paths(self):
+        with self.assertRaises(IParserException):
+            XkcdParser(file_name='', selected_paths=['top_container.not_a_key'])
+
+
+class BatchXkcdParser(XkcdParser):
+    def _refine_many_links(self, raws):
+        self.batches.append(len(raws))
+        return [x.upper() for x in raws]
+
+
+class TestBatchRefine(unittest.TestCase):
+    mapper = {
+        '__raw': {'site_url': 'https://xkcd.com/'},
+        'links': {'_locator': 'div#topLeft a', '_index': None, '_attr_refine': True},
+        'first_link': {'_locator': 'div#topLeft a', '_attr_refine': '_refine_many_links', '_attr_refine_mode': 'batch'},
+        'hrefs': {
+            '_locator': 'div#topLeft a',
+            '_index': None,
+            '_attr': 'href',
+            '_attr_refine': 'enrich_url_many',
+            '_attr_refine_mode': 'batch',
+        },
+    }
+
+    def test_01_batch_refine(self):
+        xkcd = BatchXkcdParser(file_name='', startup_yaml_config=self.mapper, is_test_mode=True)
+        xkcd.batches = []
+        data = xkcd.parse(HOME_DIR / 'tests/xkcd_python_353.htm')
+        self.assertEqual(['ARCHIVE', 'WHAT IF?', 'BLAG', 'HOW TO', 'STORE', 'ABOUT'], data['links'][:6])
+        self.assertEqual('ARCHIVE', data['first_link'])
+        # one call for all links, one for the first link
+        self.assertEqual([len(data['links']), 1], xkcd.batches)
+        self.assertEqual('https://xkcd.com/archive', data['hrefs'][0])
+        self.assertEqual('http://what-if.xkcd.com', data['hrefs'][1])
+        self.assertIsNone(xkcd.plan.nodes[0].refine)
+
+    def test_02_invalid_mode(self):
+        invalid = [
+            {'_attr_refine': True, '_attr_refine_mode': 'all'},
+            {'_attr': ['href', 'title'], '_attr_refine': True, '_attr_refine_mode': 'batch'},
+        ]
+        for config in invalid:
+            with self.assertRaises(IParserException):
+                XkcdParser(file_name='', startup_yaml_config={'links': dict(config, _locator='a')}).plan
+
+
+class TestRefinePipeline(unittest.TestCase):
+    mapper = {
+        '__raw': {'site_url': 'https://xkcd.com/'},
+        'title': {'_locator': 'head>title', '_refine': ['collapse_ws', {'replace': ['xkcd: ', '']}, 'upper']},
+        'first_word': {'_locator': 'div#ctitle', '_refine': {'last_non_empty_info': {'sep': ' ', 'index': 0}}},
+        'links': {'_locator': 'div#topLeft a', '_index': None, '_attr': 'href', '_refine': ['strip', 'enrich_url']},
+        'archive': {'_locator': 'div#topLeft a', '_attr': 'href', '_attr_refine': 'enrich_url', '_refine': 'upper'},
+        'number': {'_locator': 'head>title', '_refine': [{'remove_chars': 'xkcd: Python'}, {'default': '353'}, 'to_int']},
+    }
+
+    def test_01_pipeline(self):
+        xkcd = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', startup_yaml_config=self.mapper)
+        xkcd.do_parse()
+        self.assertEqual('PYTHON', xkcd.data['title'])
+        self.assertEqual('Python', xkcd.data['first_word'])
+        self.assertEqual('https://xkcd.com/archive', xkcd.data['links'][0])
+        self.assertEqual(353, xkcd.data['number'])
+        # `_attr_refine` goes first
+        self.assertEqual('HTTPS://XKCD.COM/ARCHIVE', xkcd.data['archive'])
+
+    def test_02_register_and_invalid(self):
+        register_refiner('reverse', lambda value: value[::-1])
+        try:
+            config = {'title': {'_locator': 'head>title', '_refine': 'reverse'}}
+            xkcd = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', startup_yaml_config=config)
+            xkcd.do_parse()
+            self.assertEqual('nohtyP :dckx', xkcd.data['title'])
+        finally:
+            REFINERS.pop('reverse')
+
+        for steps in (['not_a_step'], [{'replace': None}], [{'strip': 'a', 'lower': None}]):
+            with self.assertRaises(IParserException):
+                XkcdParser(file_name='', startup_yaml_config={'title': {'_locator': 'a', '_refine': steps}}).plan
+
+
+class OverriddenXkcdParser(XkcdParser):
+    def _get_elem_attrs(self, elem, key, config):
+        return 'OVERRIDDEN'
+
+
+class RefineAttrXkcdParser(XkcdParser):
+    def __refine_attr__(self, key, config, _attrs, raw):
+        return '{}:{}'.format(key, super().__refine_attr__(key, config, _attrs, raw))
+
+
+class TestLegacyHooks(unittest.TestCase):
+    def test_01_overridden_hooks(self):
+        config = {'page': {'title': 'head>title'}}
+        xkcd = OverriddenXkcdParser(file_name='', startup_yaml_config=config, is_test_mode=True)
+        self.assertEqual(['_get_elem_attrs'], xkcd.legacy_hooks())
+        self.assertTrue(xkcd.plan.nodes[0].legacy)
+        self.assertEqual({'page': {'title': 'OVERRIDDEN'}}, xkcd.parse(HOME_DIR / 'tests/xkcd_python_353.htm'))
+        self.assertEqual([], XkcdParser.legacy_hooks())
+
+    def test_02_refine_attr(self):
+        expected = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', is_test_mode=True)
+        expected.do_parse()
+        xkcd = RefineAttrXkcdParser(
+            file_name=HOME_DIR / 'tests/xkcd_python_353.htm', startup_yaml='xkcd', is_test_mode=True
+        )
+        xkcd.do_parse()
+        expected, menu = expected.data['top_container']['top_left'], xkcd.data['top_container']['top_left']
+        self.assertEqual(['href:{}'.format(x['href']) for x in expected], [x['href'] for x in menu])
+        self.assertEqual([x['text'] for x in expected], [x['text'] for x in menu])
+        # still callable, as before plans
+        config = {'_attr': 'href', '_attr_refine': 'enrich_url'}
+        refined = XkcdParser.__refine_attr__(xkcd, 'href', config, 'href', '/archive')
+        self.assertEqual('https://xkcd.com/archive', refined)
+
+
+class TestParserLogger(unittest.TestCase):
+    def test_01_global_level_untouched(self):
+        level = zlog.level
+        xkcd = XkcdParser(file_name=HOME_DIR / 'tests/xkcd_python_353.htm', log_level=logging.ERROR)
+        xkcd.do_parse()
+        self.assertEqual(level, zlog.level)
+        self.assertFalse(xkcd.logger.isEnabledFor(logging.DEBUG))
+
+    def test_02_instance_level(self):
+        config = {'page': {'title': 'head>title', 'missing': 'div#not_exists'}}
+        quiet = XkcdParser(
+            file_name=HOME_DIR / 'tests/xkcd_python_353.htm', startup_yaml_config=config, log_level=logging.ERROR
+        )
+        verbose = XkcdParser(
+            file_name=HOME_DIR / 'tests/xkcd_python_353.htm', startup_yaml_config=config, log_level=logging.DEBUG
+        )
+        with self.assertLogs(zlog, logging.DEBUG) as logs:
+            quiet.do_parse()
+            zlog.info('end')
+        self.assertEqual(['INFO:logzero_default:end'], logs.output)
+
+        with self.assertLogs(zlog, logging.DEBUG) as logs:
+            verbose.do_parse()
+        self.assertTrue(any('[NON-ELEMS]' in x for x in logs.output))
+        self.assertEqual(quiet.data, verbose.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
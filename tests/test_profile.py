@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+import unittest
+
+HOME_DIR = Path(__file__).parents[1]
+sys.path.append(str(HOME_DIR))
+
+from iparse import FieldProfiler
+from tests.test_iparser import XkcdParser
+
+XKCD_HTML = HOME_DIR / 'tests/xkcd_python_353.htm'
+
+
+class TestFieldProfiler(unittest.TestCase):
+    def test_01_report(self):
+        expected = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+        expected.do_parse()
+
+        xkcd = XkcdParser(file_name='', profile=True, is_test_mode=True)
+        self.assertEqual(expected.data, xkcd.parse(XKCD_HTML))
+        xkcd.parse(XKCD_HTML)
+
+        report = xkcd.profiler.report()
+        totals = [x['total'] for x in report.values()]
+        self.assertEqual(sorted(totals, reverse=True), totals)
+
+        top_left = report['top_container.top_left']
+        self.assertEqual(2, top_left['calls'])
+        self.assertEqual(len(expected.data['top_container']['top_left']) * 2, top_left['nodes'])
+        href = report['top_container.top_left.href']
+        self.assertEqual(href['nodes'], href['refine_calls'])
+        self.assertGreater(href['refine'], 0)
+        self.assertIn('top_container.top_left.href', xkcd.profiler.pretty(top=100))
+
+    def test_02_merge(self):
+        profiler = FieldProfiler()
+        for _ in range(2):
+            XkcdParser(file_name='', profile=profiler, selected_paths=['page.title']).parse(XKCD_HTML)
+        self.assertEqual(['page', 'page.title'], sorted(profiler.report()))
+        self.assertEqual(2, profiler.report()['page.title']['calls'])
+
+        merged = FieldProfiler().merge(profiler).merge(profiler.report())
+        self.assertEqual(4, merged.report()['page.title']['calls'])
+
+        profiler.reset()
+        self.assertEqual({}, profiler.report())
+
+
+if __name__ == '__main__':
+    unittest.main()
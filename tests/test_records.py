@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import json
+import pickle
+import sys
+from pathlib import Path
+import unittest
+
+HOME_DIR = Path(__file__).parents[1]
+sys.path.append(str(HOME_DIR))
+
+from iparse import MISSING, Columns, IParserException, Record, plain_data
+from tests.test_json_parser import ListDemoParser
+from tests.test_linkedin import LinkedinParser
+
+LIST_DEMO_JSON = HOME_DIR / 'tests/list_demo.json'
+LINKEDIN_HTML = HOME_DIR / 'tests/linkedin.html'
+
+
+class TestRecords(unittest.TestCase):
+    def test_01_columns(self):
+        expected = ListDemoParser(file_name='', is_test_mode=True).parse(raw=LIST_DEMO_JSON.read_text())
+
+        ldp = ListDemoParser(file_name='', records='columns', is_test_mode=True)
+        jobs = ldp.parse(raw=LIST_DEMO_JSON.read_text())['jobs']
+        self.assertIsInstance(jobs, Columns)
+        self.assertEqual(ldp.plan.nodes[0].fields, jobs.fields)
+        self.assertEqual([x['title'] for x in expected['jobs']], jobs.column('title'))
+        self.assertEqual(expected['jobs'], jobs.to_dicts())
+        self.assertEqual(expected['jobs'][1:3], jobs[1:3].to_dicts())
+        self.assertEqual(jobs, pickle.loads(pickle.dumps(jobs)))
+        self.assertEqual(expected, json.loads(ldp.data_as_json))
+        self.assertEqual(expected, plain_data(ldp.data))
+
+    def test_02_slots(self):
+        expected = LinkedinParser(file_name='', is_test_mode=True).parse(LINKEDIN_HTML.read_bytes())
+
+        linkedin = LinkedinParser(file_name='', records='slots', is_test_mode=True)
+        data = linkedin.parse(LINKEDIN_HTML.read_bytes())
+        self.assertEqual(expected, data)
+        self.assertEqual(expected, plain_data(pickle.loads(pickle.dumps(data))))
+
+        ldp = ListDemoParser(file_name='', records='slots', is_test_mode=True)
+        job = ldp.parse(raw=LIST_DEMO_JSON.read_text())['jobs'][0]
+        self.assertIsInstance(job, Record)
+        self.assertFalse(hasattr(job, '__dict__'))
+        # containers inside items are records too
+        self.assertIsInstance(job['company'], Record)
+        self.assertEqual(job.title, job['title'])
+        expected = ListDemoParser(file_name=LIST_DEMO_JSON, is_test_mode=True)
+        expected.do_parse()
+        self.assertEqual(expected.data_as_yaml, ldp.data_as_yaml)
+
+    def test_03_missing_keys(self):
+        columns = Columns(('a', 'b'))
+        columns.append({'a': 1})
+        columns.append({'a': 2, 'b': 3})
+        self.assertEqual([1, 2], columns.column('a'))
+        self.assertEqual([MISSING, 3], columns.column('b'))
+        self.assertEqual([{'a': 1}, {'a': 2, 'b': 3}], columns.to_dicts())
+        self.assertIs(MISSING, pickle.loads(pickle.dumps(MISSING)))
+
+        record = pickle.loads(pickle.dumps(ListDemoParser(file_name='', records='slots').parse(raw='[{}]')))
+        self.assertEqual({}, record)
+
+    def test_04_invalid(self):
+        with self.assertRaises(IParserException):
+            ListDemoParser(file_name='', records='rows')
+        with self.assertRaises(IParserException):
+            ListDemoParser(file_name='', records='slots', startup_yaml_config={'jobs': {'not-a-name': 'a'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import concurrent.futures
+import copy
+import mmap
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+import unittest
+from unittest import mock
+
+HOME_DIR = Path(__file__).parents[1]
+sys.path.append(str(HOME_DIR))
+
+from iparse import IParserException, LazyData
+from iparse._pool import current_rss
+from tests.test_iparser import XkcdParser
+from tests.test_json_parser import ListDemoParser
+
+XKCD_HTML = HOME_DIR / 'tests/xkcd_python_353.htm'
+
+
+class TestReusableParser(unittest.TestCase):
+    def test_01_lazy_soup(self):
+        xkcd = XkcdParser(file_name='', is_test_mode=True)
+        self.assertIsNone(xkcd.soup)
+        self.assertEqual({}, xkcd.data)
+
+    def test_02_parse_many(self):
+        expected = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+        expected.do_parse()
+
+        xkcd = XkcdParser(file_name='', is_test_mode=True)
+        plan = xkcd.plan
+        from_path = xkcd.parse(XKCD_HTML)
+        from_raw = xkcd.parse(XKCD_HTML.read_bytes())
+        self.assertEqual(expected.data, from_path)
+        self.assertEqual(expected.data, from_raw)
+        self.assertIsNot(from_path, from_raw)
+        self.assertIs(from_raw, xkcd.data)
+        self.assertIs(plan, xkcd.plan)
+
+    def test_04_str_is_path(self):
+        xkcd = XkcdParser(file_name='', is_test_mode=True)
+        expected = dict(xkcd.parse(XKCD_HTML))
+        # str is a path, as `file_name` is, markup goes with `raw`
+        self.assertEqual(expected, xkcd.parse(str(XKCD_HTML)))
+        self.assertEqual(expected, xkcd.parse(raw=XKCD_HTML.read_text()))
+        with self.assertRaises(FileNotFoundError):
+            xkcd.parse('<html><head><title>another</title></head></html>')
+        with self.assertRaises(IParserException):
+            xkcd.parse(XKCD_HTML, raw='<html></html>')
+
+    def test_05_copy_shares_plan(self):
+        xkcd = XkcdParser(
+            file_name='', startup_yaml_config={'page': {'title': 'head>title'}}, selected_paths=['page.title']
+        )
+        xkcd.parse(XKCD_HTML)
+        clone = copy.copy(xkcd)
+        self.assertIs(xkcd.plan, clone.plan)
+        self.assertIs(xkcd.selected_plan, clone.selected_plan)
+        self.assertIsNone(clone.soup)
+        self.assertEqual({}, clone.data)
+        self.assertEqual(xkcd.data, clone.parse(XKCD_HTML))
+
+    def test_03_json_parse_many(self):
+        ldp = ListDemoParser(file_name='', is_test_mode=True)
+        raw = (HOME_DIR / 'tests/list_demo.json').read_text()
+        first = ldp.parse(raw=raw)
+        self.assertEqual(6, len(first['jobs']))
+        self.assertEqual(first, ldp.parse(raw=raw))
+
+
+class TestDocumentInput(unittest.TestCase):
+    def test_01_file_mmap_memoryview(self):
+        for engine in ('bs4', 'lxml'):
+            expected = XkcdParser(file_name=XKCD_HTML, engine=engine, is_test_mode=True)
+            expected.do_parse()
+
+            xkcd = XkcdParser(file_name='', engine=engine, is_test_mode=True)
+            with open(XKCD_HTML, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self.assertEqual(expected.data, xkcd.parse(mm), engine)
+                # mmap is not consumed, so it can be parsed again
+                self.assertEqual(expected.data, xkcd.parse(mm), engine)
+                self.assertEqual(0, mm.tell())
+                self.assertEqual(expected.data, xkcd.parse(memoryview(XKCD_HTML.read_bytes())), engine)
+                self.assertEqual(expected.data, xkcd.parse(fp), engine)
+
+    def test_02_release_raw_data(self):
+        for engine in ('bs4', 'lxml'):
+            xkcd = XkcdParser(file_name=XKCD_HTML, engine=engine, keep_raw_data=False, is_test_mode=True)
+            self.assertEqual('', xkcd.raw_data)
+            xkcd.do_parse()
+            self.assertEqual('xkcd: Python', xkcd.data['page']['title'])
+
+        ldp = ListDemoParser(file_name=HOME_DIR / 'tests/list_demo.json', keep_raw_data=False)
+        self.assertEqual('', ldp.raw_data)
+        with open(HOME_DIR / 'tests/list_demo.json', 'rb') as fp:
+            self.assertEqual(6, len(ldp.parse(fp)['jobs']))
+
+    def test_03_empty_document(self):
+        for raw_or_path in (b'', memoryview(b'')):
+            with self.assertRaises(IParserException):
+                XkcdParser(file_name='', is_test_mode=True).parse(raw_or_path)
+        with self.assertRaises(IParserException):
+            XkcdParser(file_name='', is_test_mode=True).parse(raw='')
+        with self.assertRaises(IParserException):
+            ListDemoParser(file_name='', is_test_mode=True).parse(b'')
+
+
+class TestRelease(unittest.TestCase):
+    def test_01_release_after_parse(self):
+        for engine in ('bs4', 'lxml'):
+            expected = XkcdParser(file_name=XKCD_HTML, engine=engine, is_test_mode=True)
+            expected.do_parse()
+
+            xkcd = XkcdParser(file_name='', engine=engine, is_test_mode=True)
+            data = xkcd.parse(XKCD_HTML.read_bytes(), release=True)
+            self.assertEqual(expected.data, data, engine)
+            self.assertIsNone(xkcd.soup)
+            self.assertEqual('', xkcd.raw_data)
+            self.assertGreater(xkcd.released_bytes, len(XKCD_HTML.read_bytes()), engine)
+            # parser is still usable
+            self.assertEqual(expected.data, xkcd.parse(XKCD_HTML), engine)
+
+    def test_02_context_manager(self):
+        with XkcdParser(file_name=XKCD_HTML, lazy=True, is_test_mode=True) as xkcd:
+            xkcd.do_parse()
+            self.assertIsInstance(xkcd.data, LazyData)
+        # lazy data is materialized before the tree is freed
+        self.assertIsNone(xkcd.soup)
+        self.assertIs(dict, type(xkcd.data))
+        self.assertEqual('xkcd: Python', xkcd.data['page']['title'])
+        self.assertEqual(0, xkcd.close())
+
+    def test_03_json_release(self):
+        ldp = ListDemoParser(file_name='', is_test_mode=True)
+        raw = (HOME_DIR / 'tests/list_demo.json').read_text()
+        data = ldp.parse(raw=raw)
+        self.assertGreater(ldp.release(), sys.getsizeof(raw))
+        self.assertEqual(6, len(data['jobs']))
+
+
+class TestParseMemo(unittest.TestCase):
+    mapper = {
+        'menu': {
+            '_locator': 'div#topLeft>ul>li>a',
+            '_index': None,
+            'text': None,
+            'text_upper': {'_attr_refine': '_refine_upper'},
+            'href': {'_attr': 'href'},
+        },
+        'first_menu': {'_locator': 'div#topLeft>ul>li>a', '_index': 0},
+        'first_menu_again': {'_locator': 'div#topLeft>ul>li>a', '_index': 0},
+    }
+
+    def test_01_memo(self):
+        for engine in ('bs4', 'lxml'):
+            expected = MemoXkcdParser(file_name='', startup_yaml_config=self.mapper, engine=engine, is_test_mode=True)
+            xkcd = MemoXkcdParser(
+                file_name='', startup_yaml_config=self.mapper, engine=engine, memo=True, is_test_mode=True
+            )
+            self.assertEqual(expected.parse(XKCD_HTML), xkcd.parse(XKCD_HTML), engine)
+            self.assertEqual('ARCHIVE', xkcd.data['menu'][0]['text_upper'])
+
+            stats = xkcd.memo_stats
+            # `first_menu` and `first_menu_again` reuse elems and text of `menu`, `text_upper` reuses text of `text`
+            self.assertEqual(2, stats['select']['hits'], engine)
+            self.assertEqual(len(xkcd.data['menu']) + 2, stats['text']['hits'], engine)
+            self.assertGreater(stats['text']['hit_rate'], 0)
+            self.assertIsNone(xkcd._memo)
+            self.assertEqual({}, expected.memo_stats)
+
+    def test_02_lazy(self):
+        xkcd = MemoXkcdParser(file_name='', startup_yaml_config=self.mapper, lazy=True, memo=True, is_test_mode=True)
+        data = xkcd.parse(XKCD_HTML)
+        self.assertEqual(data['first_menu'], data['first_menu_again'])
+        # stats are pending until all keys are parsed
+        self.assertEqual({}, xkcd.memo_stats)
+        data.materialize()
+        self.assertEqual(2, xkcd.memo_stats['select']['hits'])
+        self.assertEqual(len(data['menu']) + 2, xkcd.memo_stats['text']['hits'])
+
+        # stats of released lazy data
+        xkcd.parse(XKCD_HTML)
+        self.assertEqual({}, xkcd.memo_stats)
+        xkcd.release()
+        self.assertEqual(2, xkcd.memo_stats['select']['hits'])
+
+
+class MemoXkcdParser(XkcdParser):
+    def _refine_upper(self, raw):
+        return raw.upper()
+
+
+class TestLazyData(unittest.TestCase):
+    def test_01_parse_on_access(self):
+        expected = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+        expected.do_parse()
+
+        xkcd = XkcdParser(file_name=XKCD_HTML, lazy=True, is_test_mode=True)
+        xkcd.do_parse()
+        self.assertIsInstance(xkcd.data, LazyData)
+        self.assertEqual([], xkcd.data.evaluated_keys)
+
+        self.assertEqual(expected.data['page'], xkcd.data['page'])
+        self.assertEqual(['page'], xkcd.data.evaluated_keys)
+        self.assertIs(xkcd.data['page'], xkcd.data['page'])
+        self.assertNotIn('not_a_key', xkcd.data)
+
+        self.assertEqual(expected.data, xkcd.materialize())
+        self.assertIs(dict, type(xkcd.materialize()))
+        self.assertEqual(expected.data, xkcd.data)
+        self.assertEqual(expected.data, pickle.loads(pickle.dumps(xkcd.data)))
+
+    def test_02_bound_to_its_document(self):
+        xkcd = XkcdParser(file_name='', lazy=True, is_test_mode=True)
+        first = xkcd.parse(XKCD_HTML)
+        xkcd.parse(raw='<html><head><title>another</title></head></html>')
+        self.assertEqual('xkcd: Python', first['page']['title'])
+        self.assertEqual('another', xkcd.data['page']['title'])
+
+
+class TestParseConcurrently(unittest.TestCase):
+    def test_01_threads(self):
+        pages = [XKCD_HTML, b'<html><head><title>another</title></head></html>'] * 4
+        for engine in ('bs4', 'lxml'):
+            xkcd = XkcdParser(file_name='', engine=engine, is_test_mode=True)
+            expected = [dict(xkcd.parse(x)) for x in pages]
+            self.assertEqual(expected, list(xkcd.parse_concurrently(pages, threads=3)))
+
+    def test_02_shared_kwargs_untouched(self):
+        reserved = ['__raw']
+        XkcdParser(file_name='', reserved_yaml_keys=reserved)
+        XkcdParser(file_name='', reserved_yaml_keys=reserved)
+        self.assertEqual(['__raw'], reserved)
+
+    def test_03_lxml_fresh_interpreter(self):
+        # threads race to set up the lxml engine, only a fresh interpreter has it not set up yet
+        script = '\n'.join(
+            [
+                'import sys',
+                'sys.path.append({!r})'.format(str(HOME_DIR)),
+                'from tests.test_iparser import XkcdParser',
+                'raw = open({!r}, "rb").read()'.format(str(XKCD_HTML)),
+                'xkcd = XkcdParser(file_name="", engine="lxml", is_test_mode=True)',
+                'results = list(xkcd.parse_concurrently([raw] * 8, threads=4))',
+                'assert all(x == xkcd.parse(raw) for x in results), results',
+            ]
+        )
+        proc = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+        self.assertEqual(0, proc.returncode, proc.stderr)
+
+    def test_04_profile(self):
+        expected = XkcdParser(file_name='', is_test_mode=True, profile=True)
+        for _ in range(4):
+            expected.parse(XKCD_HTML)
+
+        xkcd = XkcdParser(file_name='', is_test_mode=True, profile=True)
+        list(xkcd.parse_concurrently([XKCD_HTML] * 4, threads=2))
+        report = xkcd.profiler.report()
+        self.assertEqual(set(expected.profiler.report()), set(report))
+        for path, stats in expected.profiler.report().items():
+            self.assertEqual((stats['calls'], stats['nodes']), (report[path]['calls'], report[path]['nodes']))
+
+
+class TestParseStream(unittest.TestCase):
+    def setUp(self):
+        self.pages = [('url-{}'.format(i), XKCD_HTML if i % 2 else XKCD_HTML.read_bytes()) for i in range(6)]
+        self.xkcd = XkcdParser(file_name='', is_test_mode=True)
+        self.expected = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+        self.expected.do_parse()
+
+    async def _fetch(self):
+        for page in self.pages:
+            await asyncio.sleep(0)
+            yield page
+
+    async def _collect(self, **kwargs):
+        return [x async for x in self.xkcd.parse_stream(self._fetch(), **kwargs)]
+
+    def test_01_threads(self):
+        results = asyncio.run(self._collect(concurrency=2))
+        self.assertEqual([x[0] for x in self.pages], [x[0] for x in results])
+        self.assertTrue(all(x[1] == self.expected.data for x in results))
+
+        results = asyncio.run(self._collect(concurrency=3, ordered=False))
+        self.assertEqual(sorted(x[0] for x in self.pages), sorted(x[0] for x in results))
+
+    def test_02_process_executor(self):
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            results = asyncio.run(self._collect(concurrency=2, executor=executor))
+        self.assertEqual([x[0] for x in self.pages], [x[0] for x in results])
+        self.assertTrue(all(x[1] == self.expected.data for x in results))
+
+    def test_03_pickle_parser(self):
+        self.xkcd.parse(XKCD_HTML)
+        clone = pickle.loads(pickle.dumps(self.xkcd))
+        self.assertIsNone(clone.soup)
+        self.assertEqual(self.expected.data, clone.parse(XKCD_HTML))
+
+
+class TestParseFiles(unittest.TestCase):
+    def setUp(self):
+        expected = XkcdParser(file_name=XKCD_HTML, is_test_mode=True)
+        expected.do_parse()
+        self.expected = expected.data
+
+    def test_01_ordered(self):
+        paths = [XKCD_HTML] * 5
+        results = list(XkcdParser.parse_files(paths, workers=2, chunksize=2, is_test_mode=True))
+        self.assertEqual(5, len(results))
+        for path, data in results:
+            self.assertEqual(XKCD_HTML, path)
+            self.assertEqual(self.expected, data)
+
+    def test_02_recycled_workers(self):
+        paths = [str(XKCD_HTML)] * 6
+        results = list(
+            XkcdParser.parse_files(paths, workers=2, ordered=False, max_tasks_per_worker=1, max_rss=1, is_test_mode=True)
+        )
+        self.assertEqual(6, len(results))
+        self.assertTrue(all(data == self.expected for _, data in results))
+
+    def test_03_rss_without_proc(self):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # no `/proc` and no `psutil`, e.g. macOS, where `ru_maxrss` is in bytes
+        with mock.patch('builtins.open', side_effect=OSError), mock.patch.dict(sys.modules, {'psutil': None}):
+            with mock.patch.object(sys, 'platform', 'darwin'):
+                self.assertLess(abs(current_rss() - peak), 64 * 1024 * 1024)
+            with mock.patch.object(sys, 'platform', 'linux'):
+                self.assertLess(abs(current_rss() - peak * 1024), 64 * 1024 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()